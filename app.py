@@ -0,0 +1,85 @@
+from config import ConfigManager, UserConfig, init_config_manager
+from notify_queue import set_notifications_enabled, shutdown_notify_queue
+from ocr_service import configure_ocr_service, shutdown_ocr_service
+from rate_limiter import configure_rate_limiter
+from token_store import TokenRefresher
+from transport import get_transport
+from utils import logger
+
+
+class AppContext:
+    """应用上下文，显式负责加载配置、处理用户认证，并在退出时释放资源
+
+    用法:
+        with AppContext("config.json") as app:
+            for user in app.get_user_configs():
+                ...
+    """
+
+    def __init__(
+        self,
+        config_file: str = "config.json",
+        process_auth: bool = True,
+        refresh_interval: float | None = None,
+        notify_flush_timeout: float = 30,
+        user_filter=None,
+        user_names: list[str] | None = None,
+        notify: bool = True,
+    ):
+        """
+        Args:
+            config_file: 配置文件路径
+            process_auth: 是否在进入上下文时校验token，并为缺少或即将过期token的用户登录北京通
+            refresh_interval: 后台刷新即将过期token的检查间隔（秒），为None时不启动后台刷新
+            notify_flush_timeout: 退出时等待推送队列发送完毕的最长时间（秒）
+            user_filter: 只处理满足条件的用户（如 sharding.ShardFilter），为None时处理全部用户
+            user_names: 只按名称加载这些用户，其余用户不会被读取，为None时加载全部用户
+            notify: 是否发送推送，只读模式下关闭
+        """
+        self.config_file = config_file
+        self.process_auth = process_auth
+        self.refresh_interval = refresh_interval
+        self.notify_flush_timeout = notify_flush_timeout
+        self.user_filter = user_filter
+        self.user_names = user_names
+        self.notify = notify
+        self.config_manager: ConfigManager | None = None
+        self.token_refresher: TokenRefresher | None = None
+
+    def __enter__(self) -> "AppContext":
+        set_notifications_enabled(self.notify)
+        self.config_manager = init_config_manager(self.config_file, self.user_names)
+        self.config_manager.user_filter = self.user_filter
+        # 启动时解密一次接口地址：密钥缺失或不匹配时立即失败，之后所有manager直接使用缓存
+        self.config_manager.get_decrypted_url()
+        config_data = self.config_manager.config_data
+        configure_rate_limiter(
+            host_rps=config_data.rate_limit_host_rps,
+            endpoint_rps=config_data.rate_limit_endpoint_rps,
+            min_rps=config_data.rate_limit_min_rps,
+        )
+        configure_ocr_service(workers=max(1, config_data.ocr_workers))
+        if self.process_auth:
+            self.config_manager.process_all_users()
+        if self.refresh_interval:
+            self.token_refresher = TokenRefresher(
+                self.config_manager.refresh_expiring_tokens, self.refresh_interval
+            )
+            self.token_refresher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.token_refresher is not None:
+            self.token_refresher.stop()
+        shutdown_ocr_service()
+        shutdown_notify_queue(self.notify_flush_timeout)
+        try:
+            get_transport().close()
+        except Exception as e:
+            logger.error(f"释放HTTP连接失败: {e}")
+        set_notifications_enabled(True)
+        return False
+
+    def get_user_configs(self) -> list[UserConfig]:
+        """获取用户配置列表"""
+        return self.config_manager.get_user_configs() if self.config_manager else []
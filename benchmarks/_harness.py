@@ -0,0 +1,88 @@
+"""基准测试公共工具：计时、内存分配统计和固定数据加载"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+# 直接以脚本方式运行时也能导入项目模块
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_fixture(name: str) -> dict:
+    """加载 fixtures 目录下录制的接口响应"""
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def measure(func, min_time: float = 0.5, repeat: int = 5) -> dict:
+    """
+    测量函数的吞吐和单次调用的内存分配
+
+    Args:
+        func: 无参数的被测函数
+        min_time: 每轮计时的最短时长（秒）
+        repeat: 计时轮数，取最快的一轮
+
+    Returns:
+        dict: ops_per_sec（每秒调用次数）、us_per_op（单次耗时，微秒）、
+              alloc_bytes（单次调用的峰值内存分配）、alloc_blocks（单次调用新分配的内存块数）
+    """
+    func()  # 预热
+
+    # 估算每轮需要的调用次数
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.05:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / elapsed))
+
+    best = float("inf")
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": 1 / best,
+        "us_per_op": best * 1e6,
+        "alloc_bytes": peak - base,
+        "alloc_blocks": after_blocks - before_blocks,
+    }
+
+
+def format_row(name: str, stats: dict) -> str:
+    return (
+        f"{name:<40} {stats['ops_per_sec']:>12,.0f} ops/s {stats['us_per_op']:>10.2f} us/op "
+        f"{stats['alloc_bytes']:>10,} B {stats['alloc_blocks']:>6} blocks"
+    )
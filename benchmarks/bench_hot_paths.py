@@ -0,0 +1,109 @@
+"""热点函数微基准：模型构造、申请payload生成、日期计算、批量续签决策和URL参数解析
+
+全部使用 fixtures 中录制的接口响应离线运行。
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_hot_paths.py --save        # 运行并保存为基线
+    python benchmarks/bench_hot_paths.py --compare     # 与基线对比，性能下降超过阈值时返回非0
+"""
+import argparse
+import json
+import os
+import sys
+
+from _harness import BENCH_DIR, format_row, load_fixture, measure
+from model import NewApplyForm, RecordInfo, StateData, UserInfo, VehicleInfo
+from planner import RenewalPlanner
+from utils import days_between_dates, get_url_params
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+PUBKEY_LOCATION = (
+    "https://bjt.beijing.gov.cn/renzheng/open/m/login/goLogin?client_id=100100000343"
+    "&redirect_uri=https://bjjj.jtgl.beijing.gov.cn/uc/ucfront/userauth&response_type=code"
+    "&scope=user_info&state=100100004153#/login?pubKey=MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA"
+)
+TOKEN_LOCATION = "https://bjjj.jtgl.beijing.gov.cn/uc/index.html?token=eyJhbGciOiJIUzI1NiJ9.abc.def&source=bjt"
+
+
+def build_cases() -> dict:
+    """构造被测用例，键为用例名，值为无参数的被测函数"""
+    vehicles_payload = load_fixture("get_user_id_info.json")["data"]
+    user_payload = load_fixture("get_jsrxx.json")["data"]
+    state_payload = load_fixture("state_list.json")["data"]
+
+    vehicle = VehicleInfo.from_api_response(vehicles_payload[0])
+    user_info = UserInfo.from_api_response(user_payload)
+    form = NewApplyForm(vehicle_info=vehicle, user_info=user_info, apply_date="2026-10-18")
+    record = RecordInfo.from_api_response(state_payload["bzclxx"][0]["bzxx"][0])
+    # 1000个用户 x 10辆车，用于批量续签决策
+    fleet_states = {
+        f"user{i:04d}": StateData.from_api_response(
+            {**state_payload, "bzclxx": state_payload["bzclxx"] * 10}
+        )
+        for i in range(1000)
+    }
+    planner = RenewalPlanner()
+
+    return {
+        "NewApplyForm.__init__": lambda: NewApplyForm(
+            vehicle_info=vehicle, user_info=user_info, apply_date="2026-10-18", form_type="六环外"
+        ),
+        "NewApplyForm.to_api_payload": form.to_api_payload,
+        "VehicleInfo.from_api_response": lambda: VehicleInfo.from_api_response(vehicles_payload[0]),
+        "VehicleInfo.to_dict": vehicle.to_dict,
+        "UserInfo.from_api_response": lambda: UserInfo.from_api_response(user_payload),
+        "RecordInfo.calc_remaining_days": record.calc_remaining_days,
+        "RenewalPlanner.plan(10k vehicles)": lambda: planner.plan(fleet_states),
+        "utils.days_between_dates": lambda: days_between_dates("2026-10-17", "2026-10-21"),
+        "utils.get_url_params(fragment)": lambda: get_url_params(PUBKEY_LOCATION, "pubKey"),
+        "utils.get_url_params(query)": lambda: get_url_params(TOKEN_LOCATION, "token"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点函数微基准")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线对比")
+    parser.add_argument("--threshold", type=float, default=20, help="吞吐下降超过该百分比视为性能回退")
+    parser.add_argument("--min-time", type=float, default=0.3, help="每轮计时的最短时长（秒）")
+    parser.add_argument("-k", dest="keyword", help="只运行名称包含该关键字的用例")
+    args = parser.parse_args()
+
+    results = {}
+    for name, func in build_cases().items():
+        if args.keyword and args.keyword not in name:
+            continue
+        results[name] = measure(func, args.min_time)
+        print(format_row(name, results[name]))
+
+    regressions = []
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f"基线文件不存在: {args.baseline}")
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n与基线对比（阈值 {args.threshold:.0f}%）:")
+        for name, stats in results.items():
+            if name not in baseline:
+                continue
+            change = (stats["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1) * 100
+            alloc_change = stats["alloc_bytes"] - baseline[name]["alloc_bytes"]
+            flag = ""
+            if change < -args.threshold:
+                flag = "  <-- 性能回退"
+                regressions.append(name)
+            print(f"{name:<40} {change:+7.1f}% ops/s {alloc_change:+8,} B{flag}")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\n基线已保存: {args.baseline}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""冷启动基准测试：在全部用户都已有token的情况下，测量导入与进入AppContext的耗时
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_import.py --users 200 --runs 5 --output import_baseline.json
+
+每次运行都会在独立的子进程中以 `python -X importtime` 启动，统计：
+- 子进程总耗时（导入 cross_bj + 加载配置 + 处理认证）
+- 各顶层包的累计导入耗时
+- 是否在启动阶段加载了 ddddocr（全部用户已认证时不应加载）
+- 子进程最大RSS
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from cryptography.fernet import Fernet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = """
+import cross_bj
+from app import AppContext
+with AppContext("config.json") as app:
+    app.get_user_configs()
+"""
+
+
+def prepare_workdir(workdir: str, users: int):
+    """生成密钥文件和全部用户都已认证的配置文件"""
+    key = Fernet.generate_key()
+    with open(os.path.join(workdir, "url_key.key"), "wb") as f:
+        f.write(key)
+    url = base64.b64encode(Fernet(key).encrypt(b"http://127.0.0.1:9/api")).decode()
+    # token刚刚校验过，启动时既不需要登录也不需要校验
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    config = {
+        "url": url,
+        "users": [
+            {
+                "name": f"user{i}",
+                "auth": f"token{i}",
+                "auth_obtained_at": now,
+                "auth_validated_at": now,
+                "bjt_phone": f"1380000{i:04d}",
+                "bjt_pwd": "pwd",
+                "entry_type": "六环内",
+                "notify_urls": [],
+            }
+            for i in range(users)
+        ],
+    }
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """解析 -X importtime 输出，返回各顶层包的累计导入耗时（微秒）"""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        name = name.strip()
+        # 只统计顶层包，子模块的耗时已包含在包的累计耗时中
+        if "." not in name:
+            result[name] = int(cumulative_us)
+    return result
+
+
+def run_once(workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"启动失败:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(proc.stderr)
+    return {
+        "wall_time": wall,
+        "modules": modules,
+        "ddddocr_loaded": "ddddocr" in modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动耗时基准测试")
+    parser.add_argument("--users", type=int, default=200, help="模拟的已认证用户数量")
+    parser.add_argument("--runs", type=int, default=5, help="重复运行次数")
+    parser.add_argument("--top", type=int, default=10, help="显示导入耗时最高的模块数量")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, args.users)
+        runs = [run_once(workdir) for _ in range(args.runs)]
+
+    wall_times = [run["wall_time"] for run in runs]
+    module_names = runs[0]["modules"].keys()
+    modules = {
+        name: statistics.median(run["modules"].get(name, 0) for run in runs)
+        for name in module_names
+    }
+    max_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    print(f"冷启动耗时: 中位数 {statistics.median(wall_times) * 1000:.1f}ms，"
+          f"最小 {min(wall_times) * 1000:.1f}ms，最大 {max(wall_times) * 1000:.1f}ms")
+    print(f"子进程最大RSS: {max_rss_kb / 1024:.1f}MB")
+    print(f"启动阶段加载ddddocr: {'是' if any(run['ddddocr_loaded'] for run in runs) else '否'}")
+    print(f"导入耗时最高的 {args.top} 个顶层包（累计，中位数）:")
+    for name, us in sorted(modules.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"  {name:<30} {us / 1000:8.1f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "users": args.users,
+                    "runs": args.runs,
+                    "wall_time_median": statistics.median(wall_times),
+                    "max_rss_kb": max_rss_kb,
+                    "ddddocr_loaded": any(run["ddddocr_loaded"] for run in runs),
+                    "modules_us": modules,
+                },
+                f,
+                ensure_ascii=False,
+                indent=4,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""北京通登录延迟基准：获取公钥、加密、下载识别验证码、提交登录的完整耗时
+
+使用进程内的替身服务，逐个完成 --logins 次登录，输出登录耗时的中位数和p95。
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_login.py --logins 50 --latency 50 --jitter 10
+    python benchmarks/bench_login.py --login-fail-rate 0.3    # 验证码错误触发重试
+"""
+import argparse
+import time
+
+from _harness import ROOT  # noqa: F401  确保可以导入项目模块
+
+from mock_server import MockServer
+
+
+def run_logins(server: MockServer, count: int) -> tuple[list[float], int]:
+    """逐个登录，返回(每次登录耗时, 登录失败次数)"""
+    from bjt_login import BeijingTong
+
+    latencies = []
+    failures = 0
+    for i in range(count):
+        bjt = BeijingTong(f"139{i:08d}", "password", [], server.bjt_url)
+        start = time.perf_counter()
+        auth_url = bjt.login()
+        latencies.append(time.perf_counter() - start)
+        bjt.close()
+        if not auth_url:
+            failures += 1
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="北京通登录延迟基准")
+    parser.add_argument("--logins", type=int, default=30, help="登录次数")
+    parser.add_argument("--latency", type=float, default=50, help="替身服务的基础延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=10, help="替身服务的延迟抖动（毫秒）")
+    parser.add_argument("--login-fail-rate", type=float, default=0, help="登录返回验证码错误的概率")
+    args = parser.parse_args()
+
+    from loguru import logger
+
+    from ocr_service import get_ocr_service, shutdown_ocr_service
+    from utils import percentile
+
+    logger.remove()
+    logger.add(lambda message: None, level="ERROR")
+
+    server = MockServer(
+        latency_ms=args.latency, jitter_ms=args.jitter, login_fail_rate=args.login_fail_rate
+    ).start()
+    # 提前启动识别进程并完成一次识别，模型加载不计入登录耗时
+    get_ocr_service().classify(server.backend.captcha)
+    try:
+        # 预热连接和公钥缓存
+        run_logins(server, 1)
+        latencies, failures = run_logins(server, args.logins)
+        print(
+            f"登录 p50 {percentile(latencies, 50) * 1000:7.1f}ms  "
+            f"p95 {percentile(latencies, 95) * 1000:7.1f}ms  失败 {failures}/{args.logins}"
+        )
+    finally:
+        server.stop()
+        shutdown_ocr_service()
+
+
+if __name__ == "__main__":
+    main()
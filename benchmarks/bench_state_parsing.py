@@ -0,0 +1,102 @@
+"""stateList 响应解析的微基准：对比逐字段构造（旧实现）与整体 model_validate（当前实现）
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_state_parsing.py
+    python benchmarks/bench_state_parsing.py --fixture other_state_list.json
+"""
+import argparse
+
+from _harness import format_row, load_fixture, measure
+from model import RecordInfo, StateData, StateDataInfo
+
+
+def legacy_record(data: dict) -> RecordInfo:
+    return RecordInfo(
+        vId=data.get("vId", ""),
+        applyId=data.get("applyId", ""),
+        blzt=data.get("blzt", 0),
+        blztmc=data.get("blztmc", ""),
+        sxrqmc=data.get("sxrqmc", ""),
+        sxrzmc=data.get("sxrzmc"),
+        yxqs=data.get("yxqs", ""),
+        yxqz=data.get("yxqz"),
+        sxsyts=data.get("sxsyts"),
+        jjzzl=data.get("jjzzl", ""),
+        jjzzlmc=data.get("jjzzlmc", ""),
+        jjzh=data.get("jjzh"),
+        sqsj=data.get("sqsj", ""),
+        jsrxm=data.get("jsrxm", ""),
+        jszh=data.get("jszh", ""),
+        sfzmhm=data.get("sfzmhm"),
+        shsbyy=data.get("shsbyy"),
+        shsbyyms=data.get("shsbyyms"),
+        hphm=data.get("hphm", ""),
+        hpzl=data.get("hpzl", ""),
+        vid=str(data.get("vid", "")),
+    )
+
+
+def legacy_state_info(data: dict) -> StateDataInfo:
+    bzxx_list = []
+    if data.get("bzxx"):
+        bzxx_list = [legacy_record(record) for record in data["bzxx"]]
+    ecbzxx_list = []
+    if data.get("ecbzxx"):
+        ecbzxx_list = [legacy_record(record) for record in data["ecbzxx"]]
+    return StateDataInfo(
+        vId=data.get("vId", ""),
+        hpzl=data.get("hpzl", ""),
+        hphm=data.get("hphm", ""),
+        ybcs=data.get("ybcs", 0),
+        bzts=data.get("bzts", 0),
+        kjts=data.get("kjts", 0),
+        sycs=str(data.get("sycs", "")),
+        syts=str(data.get("syts", "")),
+        ylzsfkb=data.get("ylzsfkb", False),
+        elzsfkb=data.get("elzsfkb", False),
+        bnbzyy=data.get("bnbzyy"),
+        qyzt=data.get("qyzt", 0),
+        cllx=data.get("cllx", ""),
+        bzxx=bzxx_list,
+        ecbzxx=ecbzxx_list,
+        sfyecbzxx=data.get("sfyecbzxx", False),
+        ecztbz=data.get("ecztbz", False),
+    )
+
+
+def legacy_state_data(data: dict) -> StateData:
+    """改造前 StateData.from_api_response 的实现，作为对照"""
+    bzclxx_list = []
+    if data.get("bzclxx"):
+        bzclxx_list = [legacy_state_info(vehicle) for vehicle in data["bzclxx"]]
+    return StateData(
+        sfzmhm=data.get("sfzmhm", ""),
+        ylzqyms=data.get("ylzqyms", ""),
+        ylzmc=data.get("ylzmc", ""),
+        elzqyms=data.get("elzqyms", ""),
+        elzmc=data.get("elzmc", ""),
+        bzclxx=bzclxx_list,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stateList 解析基准测试")
+    parser.add_argument("--fixture", default="state_list.json", help="fixtures 目录下的 stateList 响应文件")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每轮计时的最短时长（秒）")
+    args = parser.parse_args()
+
+    payload = load_fixture(args.fixture)["data"]
+
+    # 两种实现必须得到相同的对象
+    if legacy_state_data(payload) != StateData.from_api_response(payload):
+        raise SystemExit("解析结果不一致")
+
+    legacy = measure(lambda: legacy_state_data(payload), args.min_time)
+    fast = measure(lambda: StateData.from_api_response(payload), args.min_time)
+    print(format_row("legacy (逐字段构造)", legacy))
+    print(format_row("fast (model_validate)", fast))
+    print(f"加速比: {fast['ops_per_sec'] / legacy['ops_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
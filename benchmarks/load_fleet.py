@@ -0,0 +1,162 @@
+"""端到端压测：用替身服务驱动合成的用户群走完整的登录和续签流程
+
+流程: 生成N个只有北京通账号的用户 -> AppContext 并发登录获取token -> run_fleet 并发续签
+
+用法（在项目根目录执行）:
+    python benchmarks/load_fleet.py --users 1000 --concurrency 32 --latency 50 --jitter 20
+    python benchmarks/load_fleet.py --users 100 --server http://127.0.0.1:8000   # 使用单独启动的替身服务
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+
+from _harness import ROOT  # noqa: F401  确保可以导入项目模块
+from cryptography.fernet import Fernet
+
+from mock_server import MockServer
+
+
+def prepare_workdir(
+    workdir: str,
+    users: int,
+    jtgl_url: str,
+    bjt_url: str,
+    login_concurrency: int,
+    host_rps: float = 0,
+    endpoint_rps: float = 0,
+):
+    """生成密钥文件和合成用户的配置文件"""
+    key = Fernet.generate_key()
+    with open(os.path.join(workdir, "url_key.key"), "wb") as f:
+        f.write(key)
+    config = {
+        "url": base64.b64encode(Fernet(key).encrypt(jtgl_url.encode())).decode(),
+        "bjt_base_url": bjt_url,
+        "login_concurrency": login_concurrency,
+        "rate_limit_host_rps": host_rps,
+        "rate_limit_endpoint_rps": endpoint_rps,
+        "users": [
+            {
+                "name": f"load{i:05d}",
+                "auth": "",
+                "bjt_phone": f"139{i:08d}",
+                "bjt_pwd": "password",
+                "entry_type": "六环内" if i % 2 == 0 else "六环外",
+                "notify_urls": [],
+            }
+            for i in range(users)
+        ],
+    }
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="续签流程端到端压测")
+    parser.add_argument("--users", type=int, default=100, help="合成用户数量（10~10000）")
+    parser.add_argument("--concurrency", type=int, default=32, help="续签并发数")
+    parser.add_argument("--login-concurrency", type=int, default=16, help="登录并发数")
+    parser.add_argument("--timeout", type=float, default=120, help="单个用户续签超时（秒）")
+    parser.add_argument("--server", help="已启动的替身服务地址，不指定时在进程内启动")
+    parser.add_argument("--latency", type=float, default=30, help="进程内替身服务的基础延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=10, help="进程内替身服务的延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="进程内替身服务返回HTTP 500的概率")
+    parser.add_argument("--throttle-rps", type=float, default=0, help="进程内替身服务每个接口的限流阈值")
+    parser.add_argument("--vehicles", type=int, default=1, help="进程内替身服务每个用户名下的车辆数")
+    parser.add_argument("--host-rps", type=float, default=0, help="客户端限流：每个host每秒最多请求数，0表示不限制")
+    parser.add_argument("--endpoint-rps", type=float, default=0, help="客户端限流：每个接口每秒最多请求数，0表示不限制")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="配置存储后端")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    server = None
+    if args.server:
+        base_url = args.server.rstrip("/")
+    else:
+        server = MockServer(
+            latency_ms=args.latency,
+            jitter_ms=args.jitter,
+            error_rate=args.error_rate,
+            throttle_rps=args.throttle_rps,
+            vehicles_per_user=args.vehicles,
+        ).start()
+        base_url = server.base_url
+
+    from app import AppContext
+    from config_store import JsonConfigStore, SqliteConfigStore
+    from cross_bj import run_fleet
+    from transport import configure_transport
+    from utils import logger
+
+    logger.remove()
+    logger.add(lambda message: None, level="ERROR")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(
+            workdir,
+            args.users,
+            f"{base_url}/api",
+            f"{base_url}/renzheng",
+            args.login_concurrency,
+            args.host_rps,
+            args.endpoint_rps,
+        )
+        # 密钥文件按相对路径读取
+        os.chdir(workdir)
+        config_file = "config.json"
+        if args.store == "sqlite":
+            config_file = "config.db"
+            SqliteConfigStore(config_file).import_data(JsonConfigStore("config.json").export_data())
+        try:
+            configure_transport(pool_maxsize=max(10, args.concurrency * 2))
+            login_start = time.perf_counter()
+            with AppContext(config_file) as app:
+                login_time = time.perf_counter() - login_start
+                users = app.get_user_configs()
+                report = asyncio.run(run_fleet(users, args.concurrency, args.timeout))
+        finally:
+            os.chdir(cwd)
+
+    from rate_limiter import get_rate_limiter
+    from utils import percentile
+
+    limiter_stats = get_rate_limiter().wait_stats()
+
+    result = {
+        "users": args.users,
+        "logged_in": len(users),
+        "login_time": login_time,
+        "logins_per_sec": len(users) / login_time if login_time else 0,
+        "renew_time": report.wall_time,
+        "renewals_per_sec": report.total / report.wall_time if report.wall_time else 0,
+        "failures": len(report.failures),
+        "p50": percentile(report.latencies, 50),
+        "p95": percentile(report.latencies, 95),
+        "p99": percentile(report.latencies, 99),
+        "limiter_p95_wait": limiter_stats["p95_wait"],
+        "limiter_throttled": limiter_stats["throttled"],
+    }
+    print(f"登录: {result['logged_in']}/{args.users} 个用户，耗时 {login_time:.2f}s，"
+          f"{result['logins_per_sec']:.1f} 次/秒")
+    print(f"续签: {report.total} 个用户，失败 {result['failures']} 个，耗时 {report.wall_time:.2f}s，"
+          f"{result['renewals_per_sec']:.1f} 用户/秒")
+    print(f"单用户续签耗时: p50 {result['p50'] * 1000:.0f}ms  p95 {result['p95'] * 1000:.0f}ms  "
+          f"p99 {result['p99'] * 1000:.0f}ms")
+    print(f"限流器: 等待 {limiter_stats['delayed']}/{limiter_stats['requests']} 次，"
+          f"p95 等待 {limiter_stats['p95_wait'] * 1000:.0f}ms，被服务端限流 {limiter_stats['throttled']} 次")
+    if server is not None:
+        print(f"替身服务统计: {server.backend.stats}")
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""交管局（JTGL）和北京通（BJT）接口的本地替身服务，用于压测和端到端测试
+
+实现的接口:
+    BJT:  /renzheng/open/m/login/goUserLogin        302跳转，Location 的片段中带 pubKey；
+                                                    带有效的统一认证会话cookie时直接跳转到带code的认证地址
+          /renzheng/common/generateCaptcha          验证码图片，与公钥绑定在同一个登录页会话（JSESSIONID）上
+          /renzheng/inner/m/login/doUserLoginByPwd  账号密码登录，返回 redirectUrl
+          /uc/ucfront/userauth                      302跳转，Location 中带 token
+    JTGL: /api/pro/applyRecordController/stateList
+          /api/pro/vehicleController/getUserIdInfo
+          /api/pro/applyRecordController/getJsrxx
+          /api/pro/applyRecordController/insertApplyRecord
+          /api/auth/userController/loginUser
+
+用法（在项目根目录执行）:
+    python benchmarks/mock_server.py --port 8000 --latency 50 --jitter 20 --error-rate 0.01 --throttle-rps 200
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Crypto.Cipher import PKCS1_v1_5
+from Crypto.PublicKey import RSA
+
+# 统一认证会话cookie的名称
+SSO_COOKIE = "BJT_SSO_SESSION"
+# 登录页会话cookie的名称，公钥和验证码都绑定在该会话上
+LOGIN_COOKIE = "JSESSIONID"
+
+
+def _make_png(width: int = 100, height: int = 40) -> bytes:
+    """生成一张纯白PNG作为验证码图片"""
+    raw = b"".join(b"\x00" + b"\xff" * width * 3 for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+class TokenBucket:
+    """简单的令牌桶，用于模拟服务端限流"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockBackend:
+    """替身服务的业务状态：每个token对应一个用户，状态按token确定性生成"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rps: float = 0,
+        login_fail_rate: float = 0,
+        vehicles_per_user: int = 1,
+        sso_ttl: float = 3600,
+    ):
+        """
+        Args:
+            latency_ms: 每个请求的基础延迟（毫秒）
+            jitter_ms: 延迟的随机抖动范围（毫秒）
+            error_rate: 返回HTTP 500的概率
+            throttle_rps: 每个接口每秒允许的请求数，超出后限流，0表示不限流
+            login_fail_rate: 北京通登录返回验证码错误的概率
+            vehicles_per_user: 每个用户名下的车辆数
+            sso_ttl: 账号密码登录后统一认证会话的有效期（秒），0表示不保持会话
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.login_fail_rate = login_fail_rate
+        self.vehicles_per_user = vehicles_per_user
+        self.sso_ttl = sso_ttl
+        self.rsa_key = RSA.generate(2048)
+        self.pubkey = base64.b64encode(self.rsa_key.publickey().export_key("DER")).decode()
+        self.captcha = _make_png()
+        self.states: dict[str, dict] = {}
+        self.codes: dict[str, str] = {}
+        # 登录页会话: 会话ID -> 该会话中已经下发的内容（pubkey、captcha）
+        self.login_sessions: dict[str, set[str]] = {}
+        # 统一认证会话: 会话ID -> (手机号, 过期时间)
+        self.sso_sessions: dict[str, tuple[str, float]] = {}
+        self.lock = threading.Lock()
+        self.buckets: dict[str, TokenBucket] = {}
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "throttled": 0,
+            "applies": 0,
+            "password_logins": 0,
+            "sso_logins": 0,
+        }
+
+    # ---------- 通用 ----------
+    def simulate_latency(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def throttled(self, endpoint: str) -> bool:
+        if not self.throttle_rps:
+            return False
+        with self.lock:
+            bucket = self.buckets.setdefault(endpoint, TokenBucket(self.throttle_rps))
+        return not bucket.allow()
+
+    # ---------- BJT ----------
+    def decrypt_login(self, encrypt_data: str) -> dict:
+        cipher = PKCS1_v1_5.new(self.rsa_key)
+        plain = b"".join(
+            cipher.decrypt(base64.b64decode(chunk), None) or b"" for chunk in encrypt_data.split(",")
+        )
+        return json.loads(plain)
+
+    def issue_code(self, phone: str) -> str:
+        code = hashlib.md5(f"{phone}{time.time()}{random.random()}".encode()).hexdigest()
+        with self.lock:
+            self.codes[code] = f"tok-{phone}"
+        return code
+
+    def touch_login_session(self, session_id: str, issued: str) -> str | None:
+        """在登录页会话中记录下发了公钥或验证码，会话不存在时新建并返回新的会话ID（需要 Set-Cookie）"""
+        with self.lock:
+            if session_id in self.login_sessions:
+                self.login_sessions[session_id].add(issued)
+                return None
+            new_id = hashlib.md5(f"login{time.time()}{random.random()}".encode()).hexdigest()
+            self.login_sessions[new_id] = {issued}
+            return new_id
+
+    def consume_captcha(self, session_id: str) -> bool:
+        """账号密码登录时校验：同一个会话中必须先后下发过公钥和验证码，验证码只能使用一次"""
+        with self.lock:
+            issued = self.login_sessions.get(session_id)
+            if not issued or not {"pubkey", "captcha"} <= issued:
+                return False
+            issued.discard("captcha")
+            return True
+
+    def create_sso_session(self, phone: str) -> str | None:
+        if not self.sso_ttl:
+            return None
+        session_id = hashlib.md5(f"sso{phone}{time.time()}{random.random()}".encode()).hexdigest()
+        with self.lock:
+            self.sso_sessions[session_id] = (phone, time.time() + self.sso_ttl)
+        return session_id
+
+    def get_sso_phone(self, session_id: str) -> str | None:
+        with self.lock:
+            session = self.sso_sessions.get(session_id)
+        if session is None or session[1] <= time.time():
+            return None
+        return session[0]
+
+    def exchange_code(self, code: str) -> str | None:
+        with self.lock:
+            return self.codes.pop(code, None)
+
+    # ---------- JTGL ----------
+    def get_state(self, token: str) -> dict:
+        with self.lock:
+            if token not in self.states:
+                self.states[token] = self._initial_state(token)
+            return self.states[token]
+
+    def _initial_state(self, token: str) -> dict:
+        """按token生成用户，每辆车按车辆序号生成不同场景"""
+        seed = int(hashlib.md5(token.encode()).hexdigest(), 16)
+        return {
+            "user": {"jszh": f"1101011990{seed % 10**8:08d}", "jsrxm": "测试用户"},
+            "vehicles": [self._initial_vehicle(seed + index) for index in range(self.vehicles_per_user)],
+        }
+
+    def _initial_vehicle(self, seed: int) -> dict:
+        """场景：新车、生效中（剩余0~6天）、审核中、审核不通过"""
+        today = datetime.now().date()
+        vid = f"v{seed % 10**8:08d}"
+        hphm = f"冀A{seed % 10**5:05d}"
+        scenario = seed % 4
+        records = []
+        if scenario == 1:
+            start = today - timedelta(days=seed % 7)
+            records.append(self._record(vid, hphm, "审核通过(生效中)", 6, start))
+        elif scenario == 2:
+            records.append(self._record(vid, hphm, "审核中", 1, today))
+        elif scenario == 3:
+            records.append(self._record(vid, hphm, "审核不通过", 3, today))
+        return {
+            "vehicle": {"hpzl": "52", "hphm": hphm, "cllx": "01", "vId": vid, "qyzt": 1, "kz3": ""},
+            "records": records,
+            "sycs": 12,
+        }
+
+    @staticmethod
+    def _record(vid: str, hphm: str, status: str, blzt: int, start) -> dict:
+        return {
+            "vId": vid,
+            "applyId": hashlib.md5(f"{vid}{start}{status}".encode()).hexdigest()[:16],
+            "blzt": blzt,
+            "blztmc": status,
+            "yxqs": start.strftime("%Y-%m-%d"),
+            "yxqz": (start + timedelta(days=6)).strftime("%Y-%m-%d"),
+            "jjzzl": "01",
+            "jjzzlmc": "进京证(六环内)",
+            "sqsj": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "jsrxm": "测试用户",
+            "hphm": hphm,
+            "hpzl": "52",
+            "vid": vid,
+        }
+
+    def state_list(self, token: str) -> dict:
+        state = self.get_state(token)
+        return {
+            "sfzmhm": state["user"]["jszh"],
+            "bzclxx": [
+                {
+                    "vId": item["vehicle"]["vId"],
+                    "hpzl": item["vehicle"]["hpzl"],
+                    "hphm": item["vehicle"]["hphm"],
+                    "sycs": item["sycs"],
+                    "syts": "",
+                    "ylzsfkb": True,
+                    "elzsfkb": True,
+                    "qyzt": 1,
+                    "cllx": "01",
+                    "bzxx": list(reversed(item["records"])),
+                    "ecbzxx": [],
+                }
+                for item in state["vehicles"]
+            ],
+        }
+
+    def list_vehicles(self, token: str) -> list[dict]:
+        return [item["vehicle"] for item in self.get_state(token)["vehicles"]]
+
+    def insert_apply_record(self, token: str, payload: dict) -> dict:
+        state = self.get_state(token)
+        vid = payload.get("vId", "")
+        item = next((item for item in state["vehicles"] if item["vehicle"]["vId"] == vid), None)
+        if item is None:
+            return {"code": 500, "msg": f"车辆不存在: {vid}"}
+        apply_date = datetime.strptime(payload.get("jjrq", ""), "%Y-%m-%d").date()
+        status = "审核通过(待生效)" if apply_date > datetime.now().date() else "审核通过(生效中)"
+        with self.lock:
+            item["records"].append(self._record(vid, payload.get("hphm", ""), status, 6, apply_date))
+            item["sycs"] = max(0, item["sycs"] - 1)
+        self.count("applies")
+        return {"code": 200, "msg": "申请成功"}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend: MockBackend = None
+    base_url: str = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data: dict, status: int = 200):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _redirect(self, location: str):
+        self._send(302, headers={"Location": location})
+
+    def _login_session_headers(self, issued: str) -> dict | None:
+        new_id = self.backend.touch_login_session(self._cookie(LOGIN_COOKIE), issued)
+        return {"Set-Cookie": f"{LOGIN_COOKIE}={new_id}; Path=/; HttpOnly"} if new_id else None
+
+    def _cookie(self, name: str) -> str:
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookies[name].value if name in cookies else ""
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _handle(self, method: str):
+        backend = self.backend
+        body = self._read_body()
+        parsed = urlparse(self.path)
+        path = parsed.path
+        backend.count("requests")
+        backend.simulate_latency()
+
+        if random.random() < backend.error_rate:
+            backend.count("errors")
+            return self._send(500, b"internal error", "text/plain")
+        if backend.throttled(path):
+            backend.count("throttled")
+            if path.startswith("/api/"):
+                return self._json({"code": 429, "msg": "请求过于频繁，请稍后再试"})
+            return self._send(429, b"too many requests", "text/plain")
+
+        if path.startswith("/renzheng/") or path.startswith("/uc/"):
+            return self._handle_bjt(path, parsed.query, body)
+        if path.startswith("/api/"):
+            return self._handle_jtgl(path[len("/api/"):], body)
+        self._send(404, b"not found", "text/plain")
+
+    def _handle_bjt(self, path: str, query: str, body: bytes):
+        backend = self.backend
+        if path == "/renzheng/open/m/login/goUserLogin":
+            phone = backend.get_sso_phone(self._cookie(SSO_COOKIE))
+            if phone is not None:
+                backend.count("sso_logins")
+                return self._redirect(f"{self.base_url}/uc/ucfront/userauth?code={backend.issue_code(phone)}")
+            location = f"{self.base_url}/renzheng/open/m/login/goLogin#/login?client_id=100100000343&pubKey={backend.pubkey}"
+            return self._send(302, headers={"Location": location, **(self._login_session_headers("pubkey") or {})})
+        if path == "/renzheng/common/generateCaptcha":
+            return self._send(200, backend.captcha, "image/png", headers=self._login_session_headers("captcha"))
+        if path == "/renzheng/inner/m/login/doUserLoginByPwd":
+            form = parse_qs(body.decode("utf-8"))
+            # 公钥和验证码不属于本次请求携带的会话时，按验证码错误处理
+            if not backend.consume_captcha(self._cookie(LOGIN_COOKIE)) or random.random() < backend.login_fail_rate:
+                return self._json({"meta": {"code": "5016", "message": "验证码错误"}})
+            try:
+                login_data = backend.decrypt_login(form["encryptData"][0])
+            except Exception:
+                return self._json({"meta": {"code": "5019", "message": "账号或密码错误"}})
+            phone = login_data.get("userIdentity", "")
+            backend.count("password_logins")
+            code = backend.issue_code(phone)
+            body = json.dumps({
+                "meta": {"code": "0", "message": "成功"},
+                "data": {"redirectUrl": f"{self.base_url}/uc/ucfront/userauth?code={code}"},
+            }, ensure_ascii=False).encode("utf-8")
+            session_id = backend.create_sso_session(phone)
+            headers = {"Set-Cookie": f"{SSO_COOKIE}={session_id}; Path=/; HttpOnly"} if session_id else None
+            return self._send(200, body, headers=headers)
+        if path == "/uc/ucfront/userauth":
+            token = backend.exchange_code(parse_qs(query).get("code", [""])[0])
+            if token is None:
+                return self._send(400, b"invalid code", "text/plain")
+            return self._redirect(f"{self.base_url}/uc/index.html?token={token}")
+        self._send(404, b"not found", "text/plain")
+
+    def _handle_jtgl(self, endpoint: str, body: bytes):
+        backend = self.backend
+        token = self.headers.get("Authorization", "")
+        if not token.startswith("tok-"):
+            return self._json({"code": 401, "msg": "token无效"})
+        payload = json.loads(body) if body else {}
+        if endpoint == "pro/applyRecordController/stateList":
+            return self._json({"code": 200, "data": backend.state_list(token)})
+        if endpoint == "pro/vehicleController/getUserIdInfo":
+            return self._json({"code": 200, "data": backend.list_vehicles(token)})
+        if endpoint == "pro/applyRecordController/getJsrxx":
+            return self._json({"code": 200, "data": backend.get_state(token)["user"]})
+        if endpoint == "pro/applyRecordController/insertApplyRecord":
+            return self._json(backend.insert_apply_record(token, payload))
+        if endpoint.startswith("auth/userController/loginUser"):
+            return self._json({
+                "code": 200,
+                "data": {"mobile": token[len("tok-"):], "dlsj": datetime.now().strftime("%Y-%m-%d %H:%M:%S")},
+            })
+        self._json({"code": 404, "msg": f"未知接口: {endpoint}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class MockServer:
+    """在后台线程中运行的替身服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **backend_options):
+        self.backend = MockBackend(**backend_options)
+        handler = type("BoundMockHandler", (MockHandler,), {"backend": self.backend})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        handler.base_url = self.base_url
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def jtgl_url(self) -> str:
+        return f"{self.base_url}/api"
+
+    @property
+    def bjt_url(self) -> str:
+        return f"{self.base_url}/renzheng"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JTGL/BJT 接口替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0, help="基础延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="返回HTTP 500的概率")
+    parser.add_argument("--throttle-rps", type=float, default=0, help="每个接口每秒允许的请求数，0表示不限流")
+    parser.add_argument("--login-fail-rate", type=float, default=0, help="登录返回验证码错误的概率")
+    parser.add_argument("--vehicles", type=int, default=1, help="每个用户名下的车辆数")
+    parser.add_argument("--sso-ttl", type=float, default=3600, help="统一认证会话有效期（秒），0表示不保持会话")
+    args = parser.parse_args()
+
+    server = MockServer(
+        args.host,
+        args.port,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps,
+        login_fail_rate=args.login_fail_rate,
+        vehicles_per_user=args.vehicles,
+        sso_ttl=args.sso_ttl,
+    )
+    print(f"替身服务已启动: JTGL {server.jtgl_url}  BJT {server.bjt_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"请求统计: {server.backend.stats}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
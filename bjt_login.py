@@ -1,35 +1,104 @@
 import base64
 import json
 import time
+from functools import lru_cache
 from hashlib import md5
 
-import ddddocr
-import requests
 from Crypto.Cipher import PKCS1_v1_5
 from Crypto.PublicKey import RSA
 
 # BJT_PHONE和BJT_PWD现在通过UserConfig传递，不再从config导入
+from constant import BJT_BASE_URL, BJT_REDIRECT_URI
+from metrics import span, timed
+from ocr_service import get_ocr_service
+from transport import create_session
 from utils import get_url_params, logger, AppriseNotifier
 
-ocr = ddddocr.DdddOcr(show_ad=False)
-ocr.set_ranges("0123456789")
+
+def solve_captcha(image: bytes) -> str:
+    """交给验证码识别服务识别，模型常驻在工作进程中"""
+    with span("bjt.ocr"):
+        result = get_ocr_service().classify(image)
+    logger.debug(f"验证码识别耗时 {result.latency_ms:.1f}ms（推理 {result.inference_ms:.1f}ms）")
+    return result.text
+
+
+@lru_cache(maxsize=32)
+def load_public_key(public_key: str) -> RSA.RsaKey:
+    """解析北京通下发的公钥，同一个公钥只解析一次"""
+    return RSA.import_key(f"-----BEGIN PUBLIC KEY-----\n{public_key}\n-----END PUBLIC KEY-----")
 
 
 class BeijingTong(object):
-    def __init__(self, phone_num="", pwd="", notify_urls=None):
-        self.session = requests.Session()
+    def __init__(
+        self, phone_num="", pwd="", notify_urls=None, base_url=BJT_BASE_URL, cookie_store=None
+    ):
+        """
+        Args:
+            cookie_store: 保存登录会话cookie的 CookieJarStore，指定后登录成功时保存cookie，并可用 sso_login 免验证码登录
+        """
+        # 重试时复用同一个会话（保留keep-alive连接），只清空cookie
+        self.session = create_session()
+        self.base_url = base_url.rstrip("/")
         self.phone_num = phone_num
         self.pwd = pwd
+        self.cookie_store = cookie_store
         self.redirect_url = None
+        # 登录尝试次数（含重试）
+        self.attempts = 0
         # 使用Apprise推送通知
         self.bot = AppriseNotifier(notify_urls)
 
-    def get_pubkey(self):
-        response = self.session.get(
-            url="https://bjt.beijing.gov.cn/renzheng/open/m/login/goUserLogin?client_id=100100000343&redirect_uri=https://bjjj.jtgl.beijing.gov.cn/uc/ucfront/userauth&response_type=code&scope=user_info&state=100100004153",
+    def close(self):
+        """关闭登录会话的连接池"""
+        self.session.close()
+
+    def _go_user_login(self):
+        return self.session.get(
+            url=f"{self.base_url}/open/m/login/goUserLogin?client_id=100100000343&redirect_uri={BJT_REDIRECT_URI}&response_type=code&scope=user_info&state=100100004153",
             allow_redirects=False,
         )
 
+    @timed("bjt.sso_login")
+    def sso_login(self):
+        """用上次登录保存的cookie走统一认证跳转，会话仍然有效时直接跳转到带code的认证地址，无需验证码和密码
+
+        Returns:
+            str | None: 认证地址（交给 get_token 换取token），没有保存的cookie或会话已失效时返回None
+        """
+        if self.cookie_store is None:
+            return None
+        self.session.cookies.clear()
+        if not self.cookie_store.load(self.phone_num, self.session.cookies):
+            return None
+        try:
+            response = self._go_user_login()
+        except Exception as e:
+            logger.warning(f"使用保存的登录状态失败: {e}")
+            return None
+        location = response.headers.get("Location", "")
+        # 会话失效时跳转到带 pubKey 的登录页
+        if response.status_code == 302 and get_url_params(location, "code") and not get_url_params(location, "pubKey"):
+            # 统一认证可能续期了会话cookie
+            self.save_cookies()
+            return location
+        logger.info("保存的登录状态已失效，使用账号密码登录")
+        self.cookie_store.delete(self.phone_num)
+        return None
+
+    def save_cookies(self):
+        """保存当前会话的cookie，供下次 sso_login 使用"""
+        if self.cookie_store is None:
+            return
+        try:
+            self.cookie_store.save(self.phone_num, self.session.cookies)
+        except Exception as e:
+            logger.warning(f"保存登录状态失败: {e}")
+
+    @timed("bjt.get_pubkey")
+    def get_pubkey(self):
+        response = self._go_user_login()
+
         if response.status_code != 302:
             raise ValueError("无法获取pubKey")
         pubKey = get_url_params(response.headers.get("Location", ""), "pubKey")
@@ -39,31 +108,31 @@ class BeijingTong(object):
             raise ValueError("无法获取pubKey")
         return pubKey
 
+    @timed("bjt.get_captcha")
     def get_captcha(self):
         timestamp = int(time.time() * 1000)  # 生成动态时间戳
         resp = self.session.get(
-            url=f"https://bjt.beijing.gov.cn/renzheng/common/generateCaptcha?{timestamp}",
+            url=f"{self.base_url}/common/generateCaptcha?{timestamp}",
             stream=True,  # 添加流式传输模式
         )
         if resp.status_code == 200:
-            result = ocr.classification(resp.content)
+            result = solve_captcha(resp.content)
             return result
         else:
             raise ValueError("无法获取验证码")
 
+    @timed("bjt.login")
     def login(self):
 
         retry_count = 0
         max_retries = 3
         while retry_count < max_retries:
-            self.session = requests.Session()
-            # 修改验证码请求部分
+            self.attempts += 1
+            self.session.cookies.clear()
             try:
-                pubKey = self.get_pubkey()
-                encrypted_data = self.encrypt_data(self.phone_num, self.pwd, pubKey)
-                captcha = self.get_captcha()
+                encrypted_data, captcha = self._prepare_login()
                 resp = self.session.post(
-                    "https://bjt.beijing.gov.cn/renzheng/inner/m/login/doUserLoginByPwd",
+                    f"{self.base_url}/inner/m/login/doUserLoginByPwd",
                     data={"encryptData": encrypted_data, "captcha": captcha},
                 )
                 auth_url = None
@@ -78,6 +147,8 @@ class BeijingTong(object):
                         self.bot.send("进京证", f"登陆失败, 重试次数: {retry_count}，错误信息: {json_data.get('meta', {}).get('message')}")
                         raise Exception(f"{json_data.get('meta', {}).get('message')}")
                     auth_url = json_data.get("data", {}).get("redirectUrl", "")
+                    if auth_url:
+                        self.save_cookies()
                 else:
                     logger.error(f"登陆失败, 重试次数: {retry_count}，错误信息: {resp.text}")
                 return auth_url
@@ -88,6 +159,15 @@ class BeijingTong(object):
         
         return None
 
+    def _prepare_login(self) -> tuple[str, str]:
+        """获取公钥并加密账号密码，再下载并识别验证码，返回(加密数据, 验证码)
+
+        公钥和验证码绑定在同一个登录页会话上，必须先获取公钥拿到会话cookie再下载验证码
+        """
+        pubKey = self.get_pubkey()
+        encrypted_data = self.encrypt_data(self.phone_num, self.pwd, pubKey)
+        return encrypted_data, self.get_captcha()
+
     def encrypt_data(self, phone_num, pwd, public_key):
         data = {
             "userIdentity": phone_num,
@@ -95,14 +175,8 @@ class BeijingTong(object):
             "encryptedPwd": md5(pwd.encode("utf-8")).hexdigest().lower(),
         }
 
-        pem_public_key = (
-            f"-----BEGIN PUBLIC KEY-----\n{public_key}\n-----END PUBLIC KEY-----"
-        )
-
-        # 保持后续加密逻辑不变
         json_str = json.dumps(data, separators=(",", ":"))
-        rsa_key = RSA.import_key(pem_public_key)
-        cipher = PKCS1_v1_5.new(rsa_key)
+        cipher = PKCS1_v1_5.new(load_public_key(public_key))
 
         encrypted_chunks = []
         chunk_size = 214
@@ -116,8 +190,13 @@ class BeijingTong(object):
         return ",".join(encrypted_chunks)
 
 
-def get_token(auth_url):
-    resp = requests.get(auth_url, allow_redirects=False)
+@timed("bjt.get_token")
+def get_token(auth_url, session=None):
+    """访问认证地址换取token，优先复用登录时的会话（BeijingTong.session），未指定时使用临时会话并在结束后关闭"""
+    if session is None:
+        with create_session() as session:
+            return get_token(auth_url, session)
+    resp = session.get(auth_url, allow_redirects=False)
     if resp.status_code == 302:
         return get_url_params(resp.headers.get("Location", ""), "token")
     else:
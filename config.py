@@ -1,8 +1,13 @@
 import os
-import json
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Callable, Optional
 from bjt_login import BeijingTong, get_token
+from config_store import AUTH_FIELDS, ConfigStore, check_user_names, open_config_store
+from cookie_jar import DEFAULT_COOKIE_DIR, CookieJarStore
+from constant import BJT_BASE_URL
 from utils import logger, encrypt_url, decrypt_url
 
 # 通用配置，允许 None 值
@@ -10,8 +15,10 @@ class AllowNoneConfig:
     model_config = ConfigDict(extra='ignore', validate_assignment=True)
 
 class UserConfig(BaseModel, AllowNoneConfig):
-    name: str = Field(default="", description="用户名")
+    name: str = Field(default="", description="用户名，必须填写且不能重复")
     auth: str = Field(default="", description="认证token")
+    auth_obtained_at: str = Field(default="", description="token获取时间")
+    auth_validated_at: str = Field(default="", description="token最近一次校验通过的时间")
     bjt_phone: str = Field(default="", description="北京通手机号")
     bjt_pwd: str = Field(default="", description="北京通密码")
     entry_type: str = Field(default="六环内", description="进京证类型")
@@ -22,6 +29,28 @@ class UserConfig(BaseModel, AllowNoneConfig):
 class ConfigData(BaseModel):
     url: str = Field(default="", description="接口地址（加密存储）")
     users: list[UserConfig] = Field(default=[], description="用户配置")
+    token_ttl_hours: int = Field(default=168, description="token有效时长（小时）")
+    token_refresh_hours: int = Field(default=24, description="距离过期不足该时长时提前刷新token（小时）")
+    token_probe_minutes: int = Field(default=60, description="token校验间隔（分钟）")
+    login_concurrency: int = Field(default=8, description="同时登录北京通的用户数上限")
+    ocr_workers: int = Field(default=2, description="验证码识别进程数，每个进程加载一份ddddocr模型")
+    bjt_base_url: str = Field(default=BJT_BASE_URL, description="北京通统一认证地址")
+    bjt_cookie_dir: str = Field(default=DEFAULT_COOKIE_DIR, description="加密保存北京通登录会话cookie的目录，为空时不保存")
+    api_max_retries: int = Field(default=3, description="只读接口请求失败时的最多重试次数")
+    api_backoff_base: float = Field(default=0.5, description="第一次重试的最长退避时间（秒），之后每次翻倍")
+    api_backoff_max: float = Field(default=8, description="单次重试的最长退避时间（秒）")
+    breaker_failure_threshold: int = Field(default=10, description="接口连续失败多少次后熔断")
+    breaker_reset_seconds: float = Field(default=60, description="熔断后多久放行试探请求（秒）")
+    rate_limit_host_rps: float = Field(default=20, description="每个host每秒最多请求数，0表示不限制")
+    rate_limit_endpoint_rps: float = Field(default=10, description="每个接口每秒最多请求数，0表示不限制")
+    rate_limit_min_rps: float = Field(default=1, description="被限流后速率下调的下限")
+
+    @field_validator("users")
+    @classmethod
+    def _check_user_names(cls, users: list[UserConfig]) -> list[UserConfig]:
+        # token按名称写回存储，名称为空或重复时会写错用户
+        check_user_names([{"name": user.name} for user in users])
+        return users
     
     def get_decrypted_url(self) -> str:
         """获取解密后的URL"""
@@ -35,33 +64,87 @@ class ConfigData(BaseModel):
 class ConfigManager:
     """配置管理器，负责处理认证信息的自动获取和保存"""
     
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(
+        self,
+        config_file: str = "config.json",
+        store: Optional[ConfigStore] = None,
+        user_names: Optional[list[str]] = None,
+    ):
+        """
+        Args:
+            config_file: 配置文件路径，.db/.sqlite/.sqlite3 使用SQLite存储，其余按JSON读写
+            store: 自定义存储后端，指定后忽略 config_file 的扩展名
+            user_names: 只按名称加载这些用户（SQLite存储只读取对应的行），为None时加载全部用户
+        """
         self.config_file = config_file
+        self.store = store or open_config_store(config_file)
+        self.user_names = user_names
         self.config_data: Optional[ConfigData] = None
+        self._lock = threading.RLock()
+        self._token_store = None
+        # 每个用户本次运行的北京通登录尝试次数、登录结果，以及通过保存的登录状态免验证码登录的用户
+        self.login_attempts: dict[str, int] = {}
+        self.login_results: dict[str, bool] = {}
+        self.sso_logins: set[str] = set()
+        # 只处理满足条件的用户（多节点分片时为本节点的分片），为None时处理全部用户
+        self.user_filter: Optional[Callable[[UserConfig], bool]] = None
         self._load_config()
-        self.process_all_users()
+        cookie_dir = self.config_data.bjt_cookie_dir
+        self.cookie_store = CookieJarStore(cookie_dir) if cookie_dir else None
+
+    @property
+    def token_store(self):
+        """token元数据管理器"""
+        if self._token_store is None:
+            # 延迟导入，避免与 jtgl_manager 循环导入
+            from token_store import TokenStore
+
+            self._token_store = TokenStore(
+                ttl_hours=self.config_data.token_ttl_hours,
+                refresh_hours=self.config_data.token_refresh_hours,
+                probe_minutes=self.config_data.token_probe_minutes,
+            )
+        return self._token_store
     
+    def _load_users(self) -> list[dict]:
+        if self.user_names is None:
+            return self.store.load_users()
+        users = []
+        for name in dict.fromkeys(self.user_names):
+            user = self.store.get_user(name)
+            if user is None:
+                raise ValueError(f"配置中没有名为 {name} 的用户")
+            users.append(user)
+        return users
+
     def _load_config(self):
         """加载配置文件"""
         try:
-            with open(self.config_file, "r", encoding="utf-8") as f:
-                config_dict = json.load(f)
-            self.config_data = ConfigData(**config_dict)
+            self.config_data = ConfigData(**self.store.load_settings(), users=self._load_users())
         except Exception as e:
             logger.error(f"加载配置文件失败: {e}")
             raise
     
 
-    def _save_config(self):
-        """保存配置文件"""
+    def _save_auth(self, users: list[UserConfig]):
+        """只保存这些用户的认证信息，SQLite存储只更新对应的行"""
         try:
-            config_dict = self.config_data.model_dump()
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config_dict, f, ensure_ascii=False, indent=4)
-            logger.info("配置文件保存成功")
+            with self._lock:
+                self.store.save_auth([user.model_dump() for user in users])
+            logger.info(f"已保存 {len(users)} 个用户的认证信息")
         except Exception as e:
-            logger.error(f"保存配置文件失败: {e}")
+            logger.error(f"保存认证信息失败: {e}")
             raise
+
+    def reload_auth(self, users: list[UserConfig]):
+        """从存储中重新读取这些用户的认证信息（其他节点可能已重新登录并保存了新token），原地更新"""
+        with self._lock:
+            for user in users:
+                data = self.store.get_user(user.name)
+                if data is None:
+                    continue
+                for field in AUTH_FIELDS:
+                    setattr(user, field, data.get(field) or "")
     
     def _has_auth(self, user: UserConfig) -> bool:
         """检查用户是否已有认证信息"""
@@ -74,20 +157,43 @@ class ConfigManager:
     
     def _get_auth_token(self, user: UserConfig) -> Optional[str]:
         """通过北京通登录获取认证token"""
+        bjt = None
         try:
             logger.info(f"开始为用户 {user.name} 获取认证token")
             
             # 创建北京通登录实例
-            bjt = BeijingTong(user.bjt_phone, user.bjt_pwd, user.notify_urls)
-            
+            bjt = BeijingTong(
+                user.bjt_phone,
+                user.bjt_pwd,
+                user.notify_urls,
+                self.config_data.bjt_base_url,
+                cookie_store=self.cookie_store,
+            )
+
+            # 先用上次保存的登录状态，统一认证会话仍然有效时不需要验证码
+            token = None
+            auth_url = bjt.sso_login()
+            if auth_url:
+                try:
+                    token = get_token(auth_url, bjt.session)
+                except Exception as e:
+                    logger.warning(f"用户 {user.name} 使用保存的登录状态获取token失败: {e}")
+                if token:
+                    self.sso_logins.add(user.name)
+                    logger.info(f"用户 {user.name} 使用保存的登录状态获取token，跳过验证码登录")
+                    return token
+
             # 执行登录
-            auth_url = bjt.login()
+            try:
+                auth_url = bjt.login()
+            finally:
+                self.login_attempts[user.name] = bjt.attempts
             if not auth_url:
                 logger.error(f"用户 {user.name} 北京通登录失败")
                 return None
             
             # 获取token
-            token = get_token(auth_url)
+            token = get_token(auth_url, bjt.session)
             if not token:
                 logger.error(f"用户 {user.name} 获取token失败")
                 return None
@@ -98,13 +204,23 @@ class ConfigManager:
         except Exception as e:
             logger.error(f"用户 {user.name} 获取认证token时发生错误: {e}")
             return None
+        finally:
+            # 换取token复用登录会话，全部完成后关闭连接池
+            if bjt is not None:
+                bjt.close()
     
     def process_user_auth(self, user: UserConfig) -> UserConfig:
         """处理单个用户的认证信息"""
-        # 如果已有认证信息，直接返回
+        token_store = self.token_store
         if self._has_auth(user):
-            logger.info(f"用户 {user.name} 已有认证信息，跳过")
-            return user
+            if token_store.needs_refresh(user):
+                logger.info(f"用户 {user.name} 的token即将过期，提前刷新")
+            elif not token_store.needs_probe(user) or token_store.probe(user):
+                # 已有有效的认证信息，直接返回
+                logger.info(f"用户 {user.name} 已有认证信息，跳过")
+                return user
+            else:
+                logger.warning(f"用户 {user.name} 的token已失效，重新登录")
         
         # 如果没有北京通手机号和密码，跳过
         if not self._has_bjt_credentials(user):
@@ -113,60 +229,138 @@ class ConfigManager:
         
         # 尝试获取认证token
         token = self._get_auth_token(user)
+        self.login_results[user.name] = bool(token)
         if token:
-            user.auth = token
+            token_store.record_login(user, token)
             logger.info(f"用户 {user.name} 认证信息已更新")
         else:
             logger.warning(f"用户 {user.name} 认证信息获取失败")
         
         return user
+
+    @staticmethod
+    def _auth_state(user: UserConfig) -> tuple:
+        return (user.auth, user.auth_obtained_at, user.auth_validated_at)
     
-    def process_all_users(self):
-        """处理所有用户的认证信息"""
+    def _managed_users(self) -> list[UserConfig]:
+        """本进程负责的用户"""
+        users = self.config_data.users
+        if self.user_filter is None:
+            return users
+        return [user for user in users if self.user_filter(user)]
+
+    def process_all_users(self, users: Optional[list[UserConfig]] = None):
+        """并发处理用户（默认为本进程负责的全部用户）的认证信息，全部完成后统一保存一次配置文件"""
         if not self.config_data:
             logger.error("配置数据未加载")
             return
         
-        updated = False
-        for i, user in enumerate(self.config_data.users):
-            original_auth = user.auth
-            processed_user = self.process_user_auth(user)
-            
-            
-            # 如果认证信息发生了变化，更新配置
-            if processed_user.auth != original_auth:
-                self.config_data.users[i] = processed_user
-                updated = True
+        users = self._managed_users() if users is None else users
+        original_states = [self._auth_state(user) for user in users]
+        self.login_attempts = {}
+        self.login_results = {}
+        self.sso_logins = set()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.config_data.login_concurrency), thread_name_prefix="login"
+        ) as executor:
+            processed_users = list(executor.map(self.process_user_auth, users))
+        elapsed = time.perf_counter() - start
+
+        # process_user_auth 直接更新配置中的用户对象，这里只收集认证信息发生变化的用户
+        updated = [
+            processed_user
+            for processed_user, original_state in zip(processed_users, original_states)
+            if self._auth_state(processed_user) != original_state
+        ]
+
+        self._log_login_stats(elapsed)
         
-        # 如果有更新，保存配置文件
+        # 如果有更新，只保存认证信息发生变化的用户
         if updated:
-            self._save_config()
+            self._save_auth(updated)
             logger.info("所有用户认证信息处理完成，配置文件已更新")
         else:
             logger.info("所有用户认证信息处理完成，无需更新配置文件")
-        final_auth_users = []
-        for user in self.config_data.users:
-            if user.auth:
-                final_auth_users.append(user)
-        self.config_data.users = final_auth_users
+
+    def _log_login_stats(self, elapsed: float):
+        """输出本次北京通登录的统计信息"""
+        if not self.login_results:
+            return
+        succeeded = sum(self.login_results.values())
+        total_attempts = sum(self.login_attempts.values())
+        retried = {name: n - 1 for name, n in self.login_attempts.items() if n > 1}
+        logger.info(
+            f"北京通登录 {len(self.login_results)} 个用户，成功 {succeeded} 个，"
+            f"共尝试 {total_attempts} 次，耗时 {elapsed:.2f}s，"
+            f"吞吐 {succeeded / elapsed if elapsed > 0 else 0:.2f} 次/秒"
+        )
+        if self.sso_logins:
+            logger.info(f"使用保存的登录状态免验证码登录 {len(self.sso_logins)} 个用户")
+        if retried:
+            logger.info(f"登录重试次数: {retried}")
+
+    def refresh_expiring_tokens(self):
+        """提前刷新即将过期的token，供后台刷新线程调用"""
+        if not self.config_data:
+            return
+        token_store = self.token_store
+        updated = []
+        for user in self._managed_users():
+            if not (self._has_auth(user) and token_store.needs_refresh(user)):
+                continue
+            if not self._has_bjt_credentials(user):
+                continue
+            logger.info(f"用户 {user.name} 的token即将过期，后台提前刷新")
+            token = self._get_auth_token(user)
+            if token:
+                token_store.record_login(user, token)
+                updated.append(user)
+        if updated:
+            self._save_auth(updated)
     
     def get_config(self) -> ConfigData:
         """获取配置数据"""
         return self.config_data
     
+    def get_all_user_configs(self) -> list[UserConfig]:
+        """获取本进程负责的全部用户配置，包括没有认证信息的"""
+        if not self.config_data:
+            return []
+        return self._managed_users()
+
     def get_user_configs(self) -> list[UserConfig]:
-        """获取用户配置列表"""
-        return self.config_data.users if self.config_data else []
+        """获取本进程负责的、已有认证信息的用户配置列表"""
+        if not self.config_data:
+            return []
+        return [user for user in self._managed_users() if self._has_auth(user)]
     
     def get_decrypted_url(self) -> str:
         """获取解密后的URL"""
         return self.config_data.get_decrypted_url() if self.config_data else ""
 
 
-# 创建全局配置管理器实例
-config_manager = ConfigManager()
-config = config_manager.get_config()
+_config_manager: Optional[ConfigManager] = None
+_config_lock = threading.Lock()
+
+
+def init_config_manager(config_file: str = "config.json", user_names: Optional[list[str]] = None) -> ConfigManager:
+    """加载指定配置文件并设置为全局配置管理器，指定 user_names 时只加载这些用户"""
+    global _config_manager
+    with _config_lock:
+        _config_manager = ConfigManager(config_file, user_names=user_names)
+    return _config_manager
+
+
+def get_config_manager() -> ConfigManager:
+    """获取全局配置管理器，未初始化时加载默认配置文件（不处理认证）"""
+    global _config_manager
+    if _config_manager is None:
+        with _config_lock:
+            if _config_manager is None:
+                _config_manager = ConfigManager()
+    return _config_manager
 
 
 def get_user_configs() -> list[UserConfig]:
-    return config_manager.get_user_configs()
\ No newline at end of file
+    return get_config_manager().get_user_configs()
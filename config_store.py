@@ -0,0 +1,262 @@
+"""配置存储后端：JSON文件（整体原子写入）和SQLite（WAL模式，按用户行更新）
+
+用法（在项目根目录执行）:
+    python config_store.py import config.json config.db   # 将JSON配置导入SQLite
+    python config_store.py export config.db config.json   # 将SQLite配置导出为JSON
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from utils import logger
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+AUTH_FIELDS = ("auth", "auth_obtained_at", "auth_validated_at")
+
+
+def check_user_names(users: list[dict]):
+    """用户名称是保存token、分片租约和调度的唯一标识，不能为空也不能重复，否则抛出 ValueError"""
+    seen = {}
+    for index, user in enumerate(users, start=1):
+        name = (user.get("name") or "").strip()
+        if not name:
+            raise ValueError(f"第 {index} 个用户没有填写 name，name 用于区分各用户的token，必须填写")
+        if name in seen:
+            raise ValueError(f"第 {seen[name]} 个和第 {index} 个用户的 name 都是 {name}，name 不能重复")
+        seen[name] = index
+
+
+class ConfigStore(ABC):
+    """配置存储后端：全局配置项和用户配置分开读写，用户按名称定位"""
+
+    @abstractmethod
+    def load_settings(self) -> dict:
+        """读取除用户列表以外的全局配置项"""
+
+    @abstractmethod
+    def load_users(self) -> list[dict]:
+        """按配置顺序读取所有用户"""
+
+    @abstractmethod
+    def get_user(self, name: str) -> dict | None:
+        """按名称读取单个用户"""
+
+    @abstractmethod
+    def save_auth(self, users: list[dict]):
+        """原子地更新一批用户的认证字段（auth、auth_obtained_at、auth_validated_at），按名称定位用户"""
+
+    @abstractmethod
+    def save_all(self, settings: dict, users: list[dict]):
+        """原子地写入全部配置"""
+
+    def export_data(self) -> dict:
+        """导出为 config.json 的格式"""
+        return {**self.load_settings(), "users": self.load_users()}
+
+    def import_data(self, data: dict):
+        """从 config.json 格式的数据导入，覆盖已有配置"""
+        data = dict(data)
+        users = data.pop("users", [])
+        self.save_all(data, users)
+
+    def close(self):
+        pass
+
+
+class JsonConfigStore(ConfigStore):
+    """JSON文件存储，写入时先写临时文件再替换，进程崩溃不会留下写了一半的配置文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, data: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load_settings(self) -> dict:
+        data = self._read()
+        data.pop("users", None)
+        return data
+
+    def load_users(self) -> list[dict]:
+        return self._read().get("users", [])
+
+    def get_user(self, name: str) -> dict | None:
+        return next((user for user in self.load_users() if user.get("name") == name), None)
+
+    def save_auth(self, users: list[dict]):
+        updates = {user["name"]: user for user in users}
+        with self._lock:
+            # 以文件中的最新内容为准，只覆盖认证字段
+            data = self._read()
+            for user in data.get("users", []):
+                update = updates.get(user.get("name"))
+                if update is not None:
+                    for field in AUTH_FIELDS:
+                        user[field] = update.get(field, "")
+            self._write(data)
+
+    def save_all(self, settings: dict, users: list[dict]):
+        check_user_names(users)
+        with self._lock:
+            self._write({**settings, "users": users})
+
+
+class SqliteConfigStore(ConfigStore):
+    """SQLite存储（WAL模式），每个用户一行，认证字段单独成列，更新token只写对应的行
+
+    支持同一台机器上的多个进程同时读写；WAL依赖本机共享内存，数据库文件不能放在NFS/SMB等网络文件系统上
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            name TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            auth TEXT NOT NULL DEFAULT '',
+            auth_obtained_at TEXT NOT NULL DEFAULT '',
+            auth_validated_at TEXT NOT NULL DEFAULT '',
+            updated_at TEXT NOT NULL DEFAULT ''
+        );
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        """
+        Args:
+            path: 数据库文件路径
+            timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_user(row) -> dict:
+        data, auth, obtained_at, validated_at = row
+        user = json.loads(data)
+        user.update(auth=auth, auth_obtained_at=obtained_at, auth_validated_at=validated_at)
+        return user
+
+    @staticmethod
+    def _user_to_row(user: dict, position: int, now: str) -> tuple:
+        data = {key: value for key, value in user.items() if key not in AUTH_FIELDS}
+        return (
+            user["name"],
+            position,
+            json.dumps(data, ensure_ascii=False),
+            *(user.get(field) or "" for field in AUTH_FIELDS),
+            now,
+        )
+
+    def load_settings(self) -> dict:
+        rows = self._connection().execute("SELECT key, value FROM settings").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def load_users(self) -> list[dict]:
+        rows = self._connection().execute(
+            "SELECT data, auth, auth_obtained_at, auth_validated_at FROM users ORDER BY position"
+        ).fetchall()
+        return [self._row_to_user(row) for row in rows]
+
+    def get_user(self, name: str) -> dict | None:
+        row = self._connection().execute(
+            "SELECT data, auth, auth_obtained_at, auth_validated_at FROM users WHERE name = ?", (name,)
+        ).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def save_auth(self, users: list[dict]):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE users SET auth = ?, auth_obtained_at = ?, auth_validated_at = ?, updated_at = ? "
+                "WHERE name = ?",
+                [
+                    (*(user.get(field) or "" for field in AUTH_FIELDS), now, user["name"])
+                    for user in users
+                ],
+            )
+
+    def save_all(self, settings: dict, users: list[dict]):
+        check_user_names(users)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._connection() as conn:
+            conn.execute("DELETE FROM settings")
+            conn.executemany(
+                "INSERT INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in settings.items()],
+            )
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (name, position, data, auth, auth_obtained_at, auth_validated_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._user_to_row(user, position, now) for position, user in enumerate(users)],
+            )
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_config_store(path: str) -> ConfigStore:
+    """按文件扩展名选择存储后端：.db/.sqlite/.sqlite3 使用SQLite，其余使用JSON"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SqliteConfigStore(path)
+    return JsonConfigStore(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="配置存储导入导出")
+    parser.add_argument("action", choices=["import", "export"], help="import: JSON导入SQLite；export: SQLite导出JSON")
+    parser.add_argument("source", help="源文件")
+    parser.add_argument("target", help="目标文件")
+    args = parser.parse_args()
+
+    source = open_config_store(args.source)
+    target = open_config_store(args.target)
+    data = source.export_data()
+    target.import_data(data)
+    source.close()
+    target.close()
+    logger.info(f"已将 {args.source} 中的 {len(data.get('users', []))} 个用户{'导入' if args.action == 'import' else '导出'}到 {args.target}")
+
+
+if __name__ == "__main__":
+    main()
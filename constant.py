@@ -13,4 +13,9 @@ LICENSE_PLATE_TYPE_MAP = {
     "13": "低速车",
 }
 
-SOURCE = "99c4g1a438jgf412sa3xvckd43256h7g"
\ No newline at end of file
+SOURCE = "99c4g1a438jgf412sa3xvckd43256h7g"
+
+# 北京通统一认证地址
+BJT_BASE_URL = "https://bjt.beijing.gov.cn/renzheng"
+# 北京通登录成功后跳转的交管局认证地址
+BJT_REDIRECT_URI = "https://bjjj.jtgl.beijing.gov.cn/uc/ucfront/userauth"
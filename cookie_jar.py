@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from http.cookiejar import CookieJar
+
+from loguru import logger
+
+from secret_provider import SecretProvider, get_secret_provider
+
+DEFAULT_COOKIE_DIR = "bjt_cookies"
+
+
+class CookieJarStore:
+    """按北京通手机号保存登录会话的cookie，使用URL密钥（Fernet）加密后写入文件
+
+    文件名是手机号的哈希，目录中看不出手机号；写入时先写临时文件再替换，不会留下写了一半的文件
+    """
+
+    def __init__(self, directory: str = DEFAULT_COOKIE_DIR, provider: SecretProvider | None = None):
+        self.directory = directory
+        self._provider = provider
+
+    @property
+    def provider(self) -> SecretProvider:
+        return self._provider or get_secret_provider()
+
+    def _path(self, phone: str) -> str:
+        name = hashlib.sha256(phone.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{name}.cookies")
+
+    @staticmethod
+    def _dump_cookies(jar: CookieJar) -> list[dict]:
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires,
+                "secure": cookie.secure,
+                "rest": cookie._rest,
+            }
+            for cookie in jar
+        ]
+
+    def save(self, phone: str, jar: CookieJar):
+        """保存会话中的cookie，没有cookie时删除已保存的文件"""
+        cookies = self._dump_cookies(jar)
+        if not cookies:
+            self.delete(phone)
+            return
+        data = self.provider.fernet.encrypt(json.dumps(cookies, ensure_ascii=False).encode("utf-8"))
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(phone)
+        # mkstemp 创建的文件权限为0600
+        fd, tmp_path = tempfile.mkstemp(prefix=".cookies-", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, phone: str, jar) -> int:
+        """将保存的cookie载入会话的cookie jar（requests.cookies.RequestsCookieJar），跳过已过期的，返回载入的数量"""
+        path = self._path(phone)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "rb") as f:
+                cookies = json.loads(self.provider.fernet.decrypt(f.read()))
+        except Exception as e:
+            # 密钥更换或文件损坏，当作没有保存过
+            logger.warning(f"读取保存的登录状态失败，已忽略: {e!r}")
+            self.delete(phone)
+            return 0
+        now = time.time()
+        loaded = 0
+        for cookie in cookies:
+            if cookie["expires"] is not None and cookie["expires"] <= now:
+                continue
+            jar.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie["domain"],
+                path=cookie["path"],
+                expires=cookie["expires"],
+                secure=cookie["secure"],
+                rest=cookie["rest"],
+            )
+            loaded += 1
+        return loaded
+
+    def delete(self, phone: str):
+        try:
+            os.remove(self._path(phone))
+        except FileNotFoundError:
+            pass
@@ -1,22 +1,41 @@
 
-from datetime import datetime, timedelta
+import argparse
+import asyncio
+import signal
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from loguru import logger
-from utils import  get_future_date, AppriseNotifier, logger
-from config import get_user_configs
-from jtgl_manager import ApplyRecordManager, VehicleManager, UserManager
+from pydantic import BaseModel, Field
+from utils import  get_future_date, AppriseNotifier, FleetDigest, SendMessage, logger, percentile
+from app import AppContext
+from jtgl_manager import ApiError, ApplyRecordManager, VehicleManager, UserManager
+from metrics import get_metrics, timed
 from model import NewApplyForm, RecordInfo, StateData
+from planner import RenewalPlanner, format_plan
+from rate_limiter import get_rate_limiter
+from sharding import LeaseStore, ShardFilter, UserLease, parse_shard
+from resilience import get_resilience_stats
+from secret_provider import FileSecretProvider, configure_secret_provider
+from status_export import StatusWriter, status_rows
+from transport import configure_transport
 from config import UserConfig
 
 
+# 接管其他分片时，等待其他节点租约的检查间隔（秒）
+TAKEOVER_POLL_SECONDS = 30
+
+
 class CrossBJ:
-    def __init__(self, user: UserConfig):
+    def __init__(self, user: UserConfig, bot: SendMessage | None = None):
         self.apply_manager = ApplyRecordManager(user.auth)
         self.vehicle_manager = VehicleManager(user.auth)
         self.user_manager = UserManager(user.auth)
         self.state_data: StateData | None = None
         self.user = user
-        # 使用Apprise推送通知
-        self.bot = AppriseNotifier(user.notify_urls)
+        # 使用Apprise推送通知，汇总模式下由调用方传入汇总通知器
+        self.bot = bot or AppriseNotifier(user.notify_urls)
 
     def get_state_data(self) -> StateData:
         """获取状态数据"""
@@ -25,85 +44,158 @@ class CrossBJ:
         self.state_data = self.apply_manager.get_state_data()
         return self.state_data
 
-    def get_latest_record(self) -> RecordInfo:
-        """解析状态数据，获取最新的申请记录"""
+    async def async_get_state_data(self) -> StateData:
+        """异步获取状态数据"""
+        if self.state_data is not None:
+            return self.state_data
+        self.state_data = await self.apply_manager.async_get_state_data()
+        return self.state_data
+
+    def refresh_state_data(self):
+        """提交申请后状态已变化，重新获取最新状态，失败时保留旧状态"""
+        try:
+            self.state_data = self.apply_manager.get_state_data(refresh=True)
+        except Exception as e:
+            logger.error(f"[{self.user.name}]刷新状态数据失败: {e}")
+
+    async def async_refresh_state_data(self):
+        """refresh_state_data 的异步版本"""
+        try:
+            self.state_data = await self.apply_manager.async_get_state_data(refresh=True)
+        except Exception as e:
+            logger.error(f"[{self.user.name}]刷新状态数据失败: {e}")
+
+    def get_latest_record(self, vId: str | None = None) -> RecordInfo:
+        """解析状态数据，获取指定车辆（默认第一辆车）最新的申请记录"""
         if self.state_data is None:
             self.get_state_data()
         # 使用新的数据模型快速获取记录
         if self.state_data is None:
             raise Exception(f"[{self.user.name}]没有找到状态数据")
-        record = self.state_data.get_latest_record()
+        record = self.state_data.get_latest_record(vId)
         if record is None:
-            logger.info(f"[{self.user.name}]没有找到有效的申请记录")
+            logger.info(f"[{self.user.name}]{vId or ''}没有找到有效的申请记录")
 
         return record
 
-    def need_apply(self):
-        """检查是否需要申请进京证，返回需要申请的日期，如果不需要申请则返回None"""
+    def get_apply_dates(self) -> dict[str, str]:
+        """一次算出所有车辆的续签计划，返回 {车辆ID: 申请日期}，只包含需要申请的车辆"""
         try:
-            record = self.get_latest_record()
-            today = datetime.now().strftime("%Y-%m-%d")
-            if record is None:
-                # 新车 没有任何申请记录 直接返回今天
-                return today
-
-            # 计算剩余天数
-            remaining_days = record.calc_remaining_days()
-            status = record.get_status_description()
-            # 检查状态和剩余天数
-            if status in ["审核通过(生效中)", "审核中", "审核通过(待生效)"]:
-                if status == "审核通过(生效中)" and remaining_days <= 1:
-                    # 审核通过(生效中) 且剩余天数小于等于1天 提前申请明天的进京证
-                    return (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-                else:
-                    return None
-            # 其他情况 直接返回今天，审核失败这种就需要重新触发重新申请
-            return today
+            state_data = self.get_state_data()
         except Exception as e:
             logger.error(f"[{self.user.name}]检查续签需求失败: {e}")
+            return {}
+        return {
+            item.vId: item.apply_date
+            for item in RenewalPlanner().plan_state(self.user.name, state_data)
+            if item.apply_date is not None
+        }
+
+    def _build_apply_forms(self, apply_dates, vehicles, user_info, form_type) -> dict[str, NewApplyForm]:
+        """为每辆需要续签的车辆创建申请表单"""
+        if not vehicles:
+            raise Exception(f"[{self.user.name}]没有找到车辆信息")
+        vehicles_by_id = {vehicle.vehicle_id: vehicle for vehicle in vehicles}
+        forms = {}
+        for vId, apply_date in apply_dates.items():
+            vehicle_info = vehicles_by_id.get(vId)
+            if vehicle_info is None:
+                logger.error(f"[{self.user.name}]车辆列表中没有找到车辆 {vId}")
+                continue
+            forms[vId] = NewApplyForm(
+                vehicle_info=vehicle_info,
+                user_info=user_info,
+                apply_date=apply_date,
+                destination="北京动物园",
+                form_type=form_type,
+            )
+        return forms
+
+    def _submit_apply_form(self, vId: str, apply_form: NewApplyForm):
+        """提交单辆车的申请，失败时记录并推送，返回None"""
+        try:
+            return self.apply_manager.do_apply_record(apply_form)
+        except Exception as e:
+            logger.error(f"[{self.user.name}]{apply_form.hphm}续签执行失败: {e}")
+            self.bot.send("进京证续签失败", f"{apply_form.hphm}续签执行失败: {e}")
             return None
 
+    @timed("cross_bj.exec_apply")
     def exec_apply(self, form_type="六环内"):
-        """执行续签操作"""
-        apply_date = self.need_apply()
+        """对所有需要续签的车辆执行续签，返回 {车辆ID: 申请结果}（未能提交的为None），无需续签时返回None"""
+        apply_dates = self.get_apply_dates()
 
-        if apply_date is None:
+        if not apply_dates:
             return None
 
         try:
             # 获取车辆和用户信息
             vehicles = self.vehicle_manager.list_vehicles()
             user_info = self.user_manager.get_user_info()
+            forms = self._build_apply_forms(apply_dates, vehicles, user_info, form_type)
+        except Exception as e:
+            logger.error(f"[{self.user.name}]续签执行失败: {e}")
+            self.bot.send("进京证续签失败", f"续签执行失败: {e}")
+            return None
 
-            if not vehicles:
-                raise Exception(f"[{self.user.name}]没有找到车辆信息")
+        # 需要续签但没能创建表单的车辆记为失败（结果为None）
+        results = dict.fromkeys(apply_dates)
+        # 多辆车的申请并发提交
+        with ThreadPoolExecutor(max_workers=max(1, len(forms))) as executor:
+            futures = {
+                vId: executor.submit(self._submit_apply_form, vId, form) for vId, form in forms.items()
+            }
+            results.update((vId, future.result()) for vId, future in futures.items())
+        if forms:
+            self.refresh_state_data()
+        return results
 
-            # 创建申请表单
-            apply_form = NewApplyForm(
-                vehicle_info=vehicles[0],
-                user_info=user_info,
-                apply_date=apply_date,
-                destination="北京动物园",
-                form_type=form_type,
-            )
+    @timed("cross_bj.exec_apply")
+    async def async_exec_apply(self, form_type="六环内"):
+        """异步执行续签操作，车辆信息和用户信息并发获取，多辆车的申请并发提交"""
+        try:
+            await self.async_get_state_data()
+        except Exception as e:
+            logger.error(f"[{self.user.name}]检查续签需求失败: {e}")
+            return None
+        apply_dates = self.get_apply_dates()
 
-            # 提交申请
-            return self.apply_manager.do_apply_record(apply_form)
+        if not apply_dates:
+            return None
 
+        try:
+            vehicles, user_info = await asyncio.gather(
+                self.vehicle_manager.async_list_vehicles(),
+                self.user_manager.async_get_user_info(),
+            )
+            forms = self._build_apply_forms(apply_dates, vehicles, user_info, form_type)
         except Exception as e:
             logger.error(f"[{self.user.name}]续签执行失败: {e}")
             self.bot.send("进京证续签失败", f"续签执行失败: {e}")
             return None
 
-    def get_current_status(self):
-        """获取当前状态信息"""
+        responses = await asyncio.gather(
+            *(asyncio.to_thread(self._submit_apply_form, vId, form) for vId, form in forms.items())
+        )
+        if forms:
+            await self.async_refresh_state_data()
+        # 需要续签但没能创建表单的车辆记为失败（结果为None）
+        results = dict.fromkeys(apply_dates)
+        results.update(zip(forms.keys(), responses))
+        return results
+
+    def get_current_status(self, vId: str | None = None):
+        """获取指定车辆（默认第一辆车）的当前状态信息"""
         try:
             # 使用新的数据模型快速获取信息
-            record = self.get_latest_record()
+            record = self.get_latest_record(vId)
             if record is None:
                 raise Exception("没有找到有效的申请记录")
+            vehicle = self.state_data.get_vehicle_by_id(vId) if vId else self.state_data.get_first_vehicle()
 
             return {
+                "vId": vehicle.vId,
+                "hphm": vehicle.hphm,
                 "start_date": record.yxqs,
                 "end_date": (
                     record.yxqz if record.yxqz else get_future_date(record.yxqs, 6)
@@ -112,61 +204,536 @@ class CrossBJ:
                 "apply_type": record.jjzzlmc,
                 "apply_date": record.sqsj,
                 "remaining_days": record.calc_remaining_days(),
-                "quota_info": self.state_data.get_quota_info(),
-                "can_apply": self.state_data.can_apply(),
+                "quota_info": vehicle.get_remaining_quota(),
+                "can_apply": vehicle.can_apply(),
             }
         except Exception as e:
             logger.error(f"获取状态信息失败: {e}")
             return None
 
     def exec(self, form_type="六环内"):
-        resp = self.exec_apply(form_type)
+        results = self.exec_apply(form_type)
+        return self.report(results)
+
+    async def async_exec(self, form_type="六环内"):
+        results = await self.async_exec_apply(form_type)
+        return self.report(results)
+
+    @staticmethod
+    def _result_message(resp) -> str:
         if resp is None:
-            msg = "无需续签"
-        else:
-            msg = "续签成功" if resp["code"] == 200 else "续签失败"
-        status = self.get_current_status()
-        if status is None:
+            return "无需续签"
+        return "续签成功" if resp.get("code") == 200 else "续签失败"
+
+    def report(self, results: dict | None):
+        """汇总每辆车的续签结果和当前状态并推送，返回 {车辆ID: 状态信息}，无法获取任何状态时返回None"""
+        results = results or {}
+        vehicles = self.state_data.bzclxx if self.state_data is not None else []
+        statuses = {}
+        messages = {}
+        for vehicle in vehicles:
+            status = self.get_current_status(vehicle.vId)
+            if status is None:
+                logger.error(f"[{self.user.name}]无法获取{vehicle.hphm}的状态信息")
+                continue
+            statuses[vehicle.vId] = status
+            # 不需要续签的车辆视为无需续签；需要续签但没有提交成功（包括车辆列表中找不到而跳过）的视为续签失败
+            if vehicle.vId in results:
+                resp = results[vehicle.vId]
+                messages[vehicle.vId] = "续签失败" if resp is None else self._result_message(resp)
+            else:
+                messages[vehicle.vId] = "无需续签"
+        if not statuses:
             logger.error(f"[{self.user.name}]无法获取状态信息")
-            return
+            return None
 
-        # 格式化信息
-        start_date = status["start_date"]
-        end_date = status["end_date"]
-        status_text = status["status"]
-        apply_type = status["apply_type"]
-        apply_date = status["apply_date"]
-        remaining_days = status["remaining_days"]
-        quota_info = status["quota_info"]
+        if "续签失败" in messages.values():
+            msg = "续签失败"
+        elif "续签成功" in messages.values():
+            msg = "续签成功"
+        else:
+            msg = "无需续签"
 
         formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # 构建消息
-        title = f"进京证{msg}: {start_date[5:]}~{end_date[5:]}"
-        msg_content = f"{msg}\n"
-        msg_content += f"状态: {status_text}\n"
-        msg_content += f"有效期: {start_date}至{end_date}\n"
-        msg_content += f"剩余天数: {remaining_days}\n"
-        msg_content += f"类型: {apply_type}\n"
-        msg_content += f"申请时间: {apply_date}\n"
-        msg_content += f"执行时间: {formatted_time}\n"
-        if quota_info:
-            msg_content += f"剩余申请次数: {quota_info.get('remaining_times', 0)}\n"
+        # 构建消息，只有一辆车时保持原有格式
+        if len(statuses) == 1:
+            status = next(iter(statuses.values()))
+            title = f"进京证{msg}: {status['start_date'][5:]}~{status['end_date'][5:]}"
+        else:
+            title = f"进京证{msg}: " + "，".join(
+                f"{status['hphm']} {status['start_date'][5:]}~{status['end_date'][5:]}"
+                for status in statuses.values()
+            )
+        blocks = []
+        for vId, status in statuses.items():
+            block = f"{messages[vId]}\n"
+            if len(statuses) > 1:
+                block = f"{status['hphm']}: {block}"
+            block += f"状态: {status['status']}\n"
+            block += f"有效期: {status['start_date']}至{status['end_date']}\n"
+            block += f"剩余天数: {status['remaining_days']}\n"
+            block += f"类型: {status['apply_type']}\n"
+            block += f"申请时间: {status['apply_date']}\n"
+            quota_info = status["quota_info"]
+            if quota_info:
+                block += f"剩余申请次数: {quota_info.get('remaining_times', 0)}\n"
+            blocks.append(block)
+        msg_content = "\n".join(blocks) + f"执行时间: {formatted_time}\n"
 
         logger.info(f"[{self.user.name}] {msg_content}")
         self.bot.send(title, msg_content)
+        return statuses
 
 
-def main():
-    user_configs = get_user_configs()
-    for user in user_configs:
+class FleetReport(BaseModel):
+    """一次批量续签的运行统计"""
+    total: int = Field(default=0, description="用户总数")
+    wall_time: float = Field(default=0.0, description="总耗时（秒）")
+    latencies: list[float] = Field(default=[], description="每个用户的耗时（秒）")
+    failures: list[str] = Field(default=[], description="失败的用户名")
+    skipped: list[str] = Field(default=[], description="租约被其他节点持有或本周期已处理而跳过的用户名")
+    states: dict[str, StateData] = Field(default={}, description="每个用户处理结束时的状态数据")
+
+    def summary(self) -> str:
+        return (
+            f"共 {self.total} 个用户，失败 {len(self.failures)} 个，"
+            f"总耗时 {self.wall_time:.2f}s，"
+            f"单用户耗时 p50 {percentile(self.latencies, 50):.2f}s / "
+            f"p95 {percentile(self.latencies, 95):.2f}s"
+            + (f"，失败用户: {', '.join(self.failures)}" if self.failures else "")
+            + (f"，跳过 {len(self.skipped)} 个（其他节点处理中或已处理）" if self.skipped else "")
+        )
+
+
+async def _run_user(
+    user: UserConfig,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    digest: FleetDigest | None = None,
+    lease: UserLease | None = None,
+) -> tuple[bool, float, StateData | None] | None:
+    """在并发上限和超时限制下处理单个用户，返回(是否成功, 耗时, 最新状态数据)；没有拿到租约时返回None"""
+    async with semaphore:
+        # 轮到该用户时才获取租约，排队期间不占用租约时长
+        if lease is not None:
+            try:
+                acquired = await asyncio.to_thread(lease.acquire, user.name)
+            except sqlite3.Error as e:
+                logger.error(f"[{user.name}]获取租约失败: {e}")
+                return False, 0.0, None
+            if not acquired:
+                logger.info(f"[{user.name}]已由其他节点处理，跳过")
+                return None
         logger.info(f"[{user.name}]开始续签")
+        start = time.perf_counter()
+        cross_bj = None
+        timed_out = False
         try:
-            cross_bj = CrossBJ(user)
-            cross_bj.exec(user.entry_type)
+            bot = digest.notifier(user.name, user.notify_urls) if digest is not None else None
+            cross_bj = CrossBJ(user, bot)
+            status = await asyncio.wait_for(cross_bj.async_exec(user.entry_type), timeout)
+            success = status is not None
+        except asyncio.TimeoutError:
+            logger.error(f"[{user.name}]续签超时({timeout}s)")
+            success = False
+            timed_out = True
         except Exception as e:
             logger.error(f"[{user.name}]续签失败: {e}")
-    logger.info("所有用户续签完成")
+            success = False
+        if lease is not None:
+            await _finish_lease(user, lease, success, timed_out)
+        state_data = cross_bj.state_data if cross_bj is not None else None
+        return success, time.perf_counter() - start, state_data
+
+
+async def _finish_lease(user: UserConfig, lease: UserLease, success: bool, timed_out: bool):
+    """成功则本周期不再处理；失败立即释放，其他节点可以接管重试；
+    超时时不释放：wait_for 只取消协程，线程中的请求（可能正在提交申请）仍在执行，等租约自然到期再允许接管"""
+    try:
+        if success:
+            await asyncio.to_thread(lease.complete, user.name)
+        elif timed_out:
+            logger.warning(f"[{user.name}]超时的请求可能仍在执行，保留租约直到到期")
+        else:
+            await asyncio.to_thread(lease.release, user.name)
+    except sqlite3.Error as e:
+        logger.error(f"[{user.name}]更新租约失败: {e}")
+
+
+async def run_fleet(
+    user_configs: list[UserConfig],
+    concurrency: int = 8,
+    timeout: float = 300,
+    digest: bool = False,
+    lease: UserLease | None = None,
+) -> FleetReport:
+    """并发处理所有用户的续签，digest为True时同一推送渠道的消息合并为一条，在全部用户处理完后推送；
+    指定lease时每个用户处理前先获取租约，多个节点之间同一周期每个用户只处理一次"""
+    concurrency = max(1, concurrency)
+    # 阻塞请求在默认线程池中执行，每个用户最多同时占用两个线程
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 2))
+    semaphore = asyncio.Semaphore(concurrency)
+    fleet_digest = FleetDigest() if digest else None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_run_user(user, semaphore, timeout, fleet_digest, lease) for user in user_configs)
+    )
+    if fleet_digest is not None:
+        fleet_digest.flush()
+    report = FleetReport(total=len(user_configs), wall_time=time.perf_counter() - start)
+    for user, result in zip(user_configs, results):
+        if result is None:
+            report.skipped.append(user.name)
+            continue
+        success, latency, state_data = result
+        report.latencies.append(latency)
+        if not success:
+            report.failures.append(user.name)
+        if state_data is not None:
+            report.states[user.name] = state_data
+    return report
+
+
+async def _fetch_user_state(
+    user: UserConfig, semaphore: asyncio.Semaphore, timeout: float
+) -> tuple[StateData | None, str]:
+    """只读地获取单个用户的最新状态数据，返回(状态数据, 错误信息)，失败时状态数据为None"""
+    async with semaphore:
+        try:
+            state_data = await asyncio.wait_for(
+                ApplyRecordManager(user.auth).async_get_state_data(refresh=True), timeout
+            )
+            return state_data, ""
+        except asyncio.TimeoutError:
+            error = f"获取状态超时({timeout}s)"
+        except ApiError as e:
+            error = f"token无效或已过期，需要重新登录: {e}"
+        except Exception as e:
+            error = f"获取状态失败: {e}"
+        logger.error(f"[{user.name}]{error}")
+        return None, error
+
+
+async def fetch_states(
+    user_configs: list[UserConfig], concurrency: int = 8, timeout: float = 300
+) -> dict[str, StateData]:
+    """并发获取所有用户的状态数据（只调用stateList），返回 {用户名: 状态数据}，获取失败的用户不包含在内"""
+    concurrency = max(1, concurrency)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *(_fetch_user_state(user, semaphore, timeout) for user in user_configs)
+    )
+    return {
+        user.name: state_data
+        for user, (state_data, _) in zip(user_configs, results)
+        if state_data is not None
+    }
+
+
+async def export_status(
+    user_configs: list[UserConfig], writer: StatusWriter, concurrency: int = 8, timeout: float = 300
+) -> tuple[int, int]:
+    """并发获取所有用户的状态（只调用stateList），哪个用户先返回就先写出哪个用户的车辆，返回(成功用户数, 车辆数)"""
+    concurrency = max(1, concurrency)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(user: UserConfig):
+        state_data, error = await _fetch_user_state(user, semaphore, timeout)
+        return user.name, state_data, error
+
+    succeeded = vehicles = 0
+    for future in asyncio.as_completed([fetch(user) for user in user_configs]):
+        name, state_data, error = await future
+        writer.write_rows(status_rows(name, state_data, error))
+        if state_data is not None:
+            succeeded += 1
+            vehicles += len(state_data.bzclxx)
+    return succeeded, vehicles
+
+
+def run_plan(args):
+    """演练模式：获取所有车辆的状态并输出续签计划，不提交任何申请"""
+    with AppContext(args.config, user_filter=shard_filter(args), user_names=args.user) as app:
+        user_configs = app.get_user_configs()
+        states = asyncio.run(fetch_states(user_configs, args.concurrency, args.timeout))
+    start = time.perf_counter()
+    items = RenewalPlanner().plan(states)
+    elapsed = time.perf_counter() - start
+    print(format_plan(items))
+    logger.info(
+        f"共 {len(states)}/{len(user_configs)} 个用户、{len(items)} 辆车，"
+        f"生成计划耗时 {elapsed * 1000:.2f}ms"
+    )
+
+
+def run_status(args):
+    """状态导出模式：只读地导出所有车辆的当前状态和配额
+
+    不提交申请、不推送，也不登录北京通或刷新token：只使用已保存的token，
+    没有token或token已失效的用户各输出一行错误说明
+    """
+    start = time.perf_counter()
+    with (
+        AppContext(
+            args.config, process_auth=False, user_filter=shard_filter(args), user_names=args.user, notify=False
+        ) as app,
+        StatusWriter(args.status) as writer,
+    ):
+        config_manager = app.config_manager
+        all_users = config_manager.get_all_user_configs()
+        user_configs = config_manager.get_user_configs()
+        for user in all_users:
+            if not user.auth:
+                writer.write_rows(status_rows(user.name, None, "没有保存的token，状态导出不会登录，请先运行续签"))
+        expires_at = {user.name: config_manager.token_store.expires_at(user) for user in user_configs}
+        now = datetime.now()
+        stale = [name for name, expires in expires_at.items() if expires is not None and expires <= now]
+        if stale:
+            logger.warning(f"{len(stale)} 个用户的token已超过有效期，仍尝试使用: {', '.join(stale)}")
+        succeeded, vehicles = asyncio.run(
+            export_status(user_configs, writer, args.concurrency, args.timeout)
+        )
+    logger.info(
+        f"已导出 {succeeded}/{len(all_users)} 个用户、{vehicles} 辆车的状态到 {args.status}，"
+        f"耗时 {time.perf_counter() - start:.2f}s"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="进京证自动续签")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument(
+        "--key-file",
+        help="URL密钥文件路径，优先于环境变量 CROSS_BJ_URL_KEY / CROSS_BJ_KEY_FILE（默认 url_key.key）",
+    )
+    parser.add_argument(
+        "--user",
+        action="append",
+        metavar="NAME",
+        help="只处理该名称的用户（可重复指定），其余用户不会被读取",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="同时处理的用户数上限")
+    parser.add_argument("--timeout", type=float, default=300, help="单个用户续签的超时时间（秒）")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行，只在有车辆需要续签时唤醒")
+    parser.add_argument("--check-hour", type=int, default=8, help="常驻模式下到期当天几点检查续签")
+    parser.add_argument("--digest", action="store_true", help="汇总推送：每次运行每个推送URL只发送一条合并后的消息")
+    parser.add_argument("--plan", action="store_true", help="演练：只查询状态并输出每辆车的续签计划，不提交申请")
+    parser.add_argument(
+        "--status",
+        metavar="FILE",
+        help="状态导出：只读地将每辆车的状态和配额写入该文件（.csv 为CSV，其余为JSON Lines，- 为标准输出）",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="多节点分片：共N个节点，本节点（序号I，从0开始）只处理按一致性哈希分到自己的用户",
+    )
+    parser.add_argument(
+        "--lease-db",
+        help="租约数据库（SQLite，同一台机器上的多个节点共用，不能放在网络文件系统上），同一天每个用户只由一个节点处理一次",
+    )
+    parser.add_argument("--lease-ttl", type=float, default=0, help="租约时长（秒），节点宕机后超过该时长其他节点才能接管，默认为 --timeout 的两倍")
+    parser.add_argument("--node-id", help="节点标识，默认为 主机名:进程号")
+    parser.add_argument(
+        "--takeover-delay",
+        type=float,
+        default=60,
+        help="处理完本分片后等待多久（秒）再接管其他分片未处理的用户，需同时指定 --shard 和 --lease-db",
+    )
+    parser.add_argument("--metrics-dir", help="运行结束时将各阶段耗时写入该目录（metrics.prom 和 metrics.json）")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        metavar="DIR",
+        help="剖析模式：逐个处理用户，将整次运行和每个用户的 pstats 与折叠栈写入该目录（默认 profile）",
+    )
+    return parser.parse_args(argv)
+
+
+def shard_filter(args) -> ShardFilter | None:
+    """--shard 指定时只处理本节点分片的用户"""
+    return ShardFilter(*args.shard) if args.shard else None
+
+
+def create_lease(args) -> UserLease | None:
+    """--lease-db 指定时使用租约，租约时长默认为单个用户超时的两倍"""
+    if not args.lease_db:
+        return None
+    ttl = args.lease_ttl or args.timeout * 2
+    return UserLease(LeaseStore(args.lease_db), ttl, owner=args.node_id)
+
+
+def take_over_users(app: AppContext, shard: ShardFilter, lease: UserLease, args):
+    """接管其他分片中本周期既未完成、也没有有效租约的用户（节点宕机、未启动或处理失败）
+
+    节点在处理中途宕机时，它持有的租约要过了租约时长才会到期，所以这里会反复检查，
+    直到其他分片的用户全部完成（或已由本节点尝试过），最多等待一个租约时长
+    """
+    if args.takeover_delay > 0:
+        # 给其他节点留出处理自己分片的时间
+        logger.info(f"等待 {args.takeover_delay:.0f}s 后检查其他分片是否有未处理的用户")
+        time.sleep(args.takeover_delay)
+    config_manager = app.config_manager
+    others = [user for user in config_manager.config_data.users if not shard(user)]
+    names = [user.name for user in others]
+    deadline = time.monotonic() + lease.ttl
+    # 本节点接管过的用户不再重复接管，处理失败的留给其他节点或下一个周期
+    attempted: set[str] = set()
+    while True:
+        pending = set(lease.pending(names)) - attempted
+        # 先拿到租约再登录，多个节点同时接管时不会重复登录同一个用户
+        candidates = [user for user in others if user.name in pending and lease.acquire(user.name)]
+        if candidates:
+            attempted.update(user.name for user in candidates)
+            logger.info(f"接管其他分片的 {len(candidates)} 个用户: {', '.join(user.name for user in candidates)}")
+            # 原节点可能已经重新登录并保存了新token，先读取存储中的最新认证信息，避免重复登录
+            config_manager.reload_auth(candidates)
+            # 这些用户不在本节点启动时的认证范围内，先补充登录
+            config_manager.process_all_users(candidates)
+            users = []
+            for user in candidates:
+                if user.auth:
+                    users.append(user)
+                else:
+                    lease.release(user.name)
+            report = asyncio.run(
+                run_fleet(users, args.concurrency, args.timeout, digest=args.digest, lease=lease)
+            )
+            logger.info(f"接管的用户续签完成: {report.summary()}")
+
+        waiting = [name for name in lease.unfinished(names) if name not in attempted]
+        if not waiting:
+            logger.info("其他分片的用户均已处理完成，无需接管")
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(
+                f"等待其他节点的租约超时，仍有 {len(waiting)} 个用户未完成: {', '.join(waiting)}"
+            )
+            return
+        # 这些用户的租约仍被其他节点持有，等它们完成或租约到期
+        sleep_seconds = min(TAKEOVER_POLL_SECONDS, remaining)
+        logger.info(f"其他节点仍在处理 {len(waiting)} 个用户，{sleep_seconds:.0f}s 后再次检查")
+        time.sleep(sleep_seconds)
+
+
+def write_metrics(metrics_dir: str | None):
+    """将各阶段耗时写入指定目录"""
+    if not metrics_dir:
+        return
+    prom_path, json_path = get_metrics().write(metrics_dir)
+    logger.info(f"耗时统计已写入 {prom_path} 和 {json_path}")
+
+
+def run_daemon(args):
+    """常驻模式：后台刷新token，按有效期调度续签"""
+    from scheduler import RenewalScheduler
+
+    async def run_round(user_configs, concurrency, timeout):
+        report = await run_fleet(user_configs, concurrency, timeout, digest=args.digest)
+        # 每轮结束更新一次耗时统计，统计值在进程内累计
+        write_metrics(args.metrics_dir)
+        return report
+
+    with AppContext(
+        args.config, refresh_interval=3600, user_filter=shard_filter(args), user_names=args.user
+    ) as app:
+        scheduler = RenewalScheduler(
+            app.get_user_configs(),
+            run_round,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            check_hour=args.check_hour,
+        )
+        signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        logger.info("调度器已停止")
+
+
+def run_profiled(args):
+    """剖析模式：用户逐个同步处理，剖析数据可以准确归属到启动、每个用户和退出阶段"""
+    from profiling import RunProfiler, measure_import_times
+
+    profiler = RunProfiler(args.profile)
+    profiler.start("startup")
+    with AppContext(args.config, user_filter=shard_filter(args), user_names=args.user) as app:
+        for user in app.get_user_configs():
+            # CrossBJ 的构造也计入该用户
+            profiler.switch(f"user/{user.name}")
+            try:
+                CrossBJ(user).exec(user.entry_type)
+            except Exception as e:
+                logger.error(f"[{user.name}]续签失败: {e}")
+        profiler.switch("shutdown")
+    profiler.stop()
+    import_times = measure_import_times()
+    for module, seconds in import_times.items():
+        logger.info(f"导入 {module} 耗时 {seconds * 1000:.0f}ms")
+    output_dir = profiler.write(import_times)
+    logger.info(
+        f"剖析结果已写入 {output_dir}: run.pstats / run.collapsed 为整次运行，phases/ 下为各阶段"
+    )
+    write_metrics(args.metrics_dir)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.key_file:
+        configure_secret_provider(FileSecretProvider(args.key_file))
+    # 连接池大小与线程池保持一致，保证并发请求都能复用keep-alive连接
+    transport = configure_transport(pool_maxsize=max(10, args.concurrency * 2))
+    if args.daemon:
+        run_daemon(args)
+        return
+    if args.profile:
+        run_profiled(args)
+        return
+    if args.plan:
+        run_plan(args)
+        return
+    if args.status:
+        run_status(args)
+        return
+    shard = shard_filter(args)
+    lease = create_lease(args)
+    with AppContext(args.config, user_filter=shard, user_names=args.user) as app:
+        report = asyncio.run(
+            run_fleet(app.get_user_configs(), args.concurrency, args.timeout, digest=args.digest, lease=lease)
+        )
+        logger.info(f"所有用户续签完成: {report.summary()}")
+        if shard is not None and lease is not None:
+            try:
+                take_over_users(app, shard, lease, args)
+            except sqlite3.Error as e:
+                logger.error(f"接管其他分片的用户失败: {e}")
+        stats = transport.connection_stats()
+        logger.info(
+            f"HTTP请求 {stats['requests']} 次，新建连接 {stats['new_connections']} 个，"
+            f"复用连接 {stats['reused_connections']} 次"
+        )
+        stats = get_resilience_stats()
+        logger.info(
+            f"接口重试 {stats['retries']} 次，熔断 {stats['breaker_trips']} 次，"
+            f"熔断期间拒绝请求 {stats['breaker_rejected']} 次"
+        )
+        stats = get_rate_limiter().wait_stats()
+        logger.info(
+            f"限流器: 等待 {stats['delayed']}/{stats['requests']} 次，"
+            f"等待时间 p50 {stats['p50_wait'] * 1000:.0f}ms / p95 {stats['p95_wait'] * 1000:.0f}ms / "
+            f"最长 {stats['max_wait'] * 1000:.0f}ms，被服务端限流 {stats['throttled']} 次"
+        )
+    # 退出上下文时推送队列已发送完毕，推送耗时也计入统计
+    write_metrics(args.metrics_dir)
+
 
 if __name__ == "__main__":
     main()
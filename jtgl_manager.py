@@ -1,36 +1,125 @@
-import requests
+import asyncio
+import time
 import traceback
 from loguru import logger
+from metrics import span
 from model import VehicleInfo, UserInfo, ApplyForm, UserDetailInfo, NewApplyForm, StateData
 from constant import SOURCE
-from config import config_manager
+from config import get_config_manager
+from rate_limiter import ThrottledError, get_rate_limiter
+from resilience import (
+    RetryPolicy,
+    count_retry,
+    get_circuit_breaker,
+    is_connect_error,
+    is_throttled_error,
+    is_transient_error,
+)
+from state_cache import get_state_cache
+from transport import HttpTransport, get_transport
+
+# 会改变办证状态的接口，调用后需要让状态缓存失效
+MUTATING_ENDPOINTS = (
+    "pro/applyRecordController/insertApplyRecord",
+    "pro/relationController/add",
+    "pro/relationController/deleteRelation",
+)
+
+# 只读接口，暂时性失败时可以安全重试
+IDEMPOTENT_ENDPOINTS = (
+    "pro/applyRecordController/stateList",
+    "pro/vehicleController/getUserIdInfo",
+    "pro/applyRecordController/getJsrxx",
+)
+
+
+class ApiError(Exception):
+    """服务端正常响应，但返回了非200的业务码（例如token失效）"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
 
 
 class JTGLManager:
-    def __init__(self, token):
+    def __init__(self, token, transport: HttpTransport | None = None):
+        config_manager = get_config_manager()
+        config_data = config_manager.config_data
         self.url = config_manager.get_decrypted_url()
         self.token = token
-        self._new_session()
-
-    def _new_session(self):
-        self.session = requests.Session()
-        self.session.headers.update(
-            {"Authorization": self.token, "Content-Type": "application/json"}
+        # 所有manager共享同一个连接池，token通过每个请求的header传递
+        self.transport = transport or get_transport()
+        self.retry_policy = RetryPolicy(
+            config_data.api_max_retries, config_data.api_backoff_base, config_data.api_backoff_max
+        )
+        # 同一个接口地址的所有manager共享熔断器，服务不可用时其余用户快速失败
+        self.breaker = get_circuit_breaker(
+            self.url, config_data.breaker_failure_threshold, config_data.breaker_reset_seconds
         )
 
     def _call_api(self, url, data=None, headers=None, method="POST"):
-        url = f"{self.url}/{url}"
-        if headers is None:
-            headers = self.session.headers
-        else:
-            headers.update(self.session.headers)
-        response = self.session.request(method, url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        with span("jtgl.call_api", endpoint=url.split("?", 1)[0]):
+            return self._call_endpoint(url, data, headers, method)
+
+    def _call_endpoint(self, url, data=None, headers=None, method="POST"):
+        if url in MUTATING_ENDPOINTS:
+            # 无论提交是否成功，服务端状态都可能已变化
+            try:
+                return self._request(url, data, headers, method)
+            finally:
+                get_state_cache().invalidate(self.token)
+        return self._request(url, data, headers, method)
+
+    def _request(self, endpoint, data=None, headers=None, method="POST"):
+        url = f"{self.url}/{endpoint}"
+        request_headers = {"Authorization": self.token}
+        if headers is not None:
+            request_headers.update(headers)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = self.transport.request(method, url, json=data, headers=request_headers)
+                response.raise_for_status()
+                result = response.json()
+                if result.get("code") == 429:
+                    # HTTP 429 已由传输层的限流器处理，这里只处理业务码429
+                    get_rate_limiter().record_throttled(url)
+                    raise ThrottledError(f"{endpoint} 请求被限流: {result}")
+            except Exception as e:
+                throttled = is_throttled_error(e)
+                if throttled or not is_transient_error(e):
+                    # 服务端有响应（限流或4xx），说明接口本身可用
+                    self.breaker.record_success()
+                    if not throttled:
+                        raise
+                else:
+                    self.breaker.record_failure()
+                # 被限流或没连上的请求服务端没有处理，任何接口都可以重试；其他错误只重试只读接口。
+                # 传输层不再重试，这里是唯一的重试层，每次尝试都经过熔断器
+                retryable = throttled or is_connect_error(e) or endpoint in IDEMPOTENT_ENDPOINTS
+                max_retries = self.retry_policy.max_retries if retryable else 0
+                if attempt >= max_retries:
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                attempt += 1
+                count_retry()
+                logger.warning(f"{endpoint} 请求失败({e})，{delay:.2f}s 后第 {attempt} 次重试")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            break
+        wait = getattr(response, "rate_limit_wait", 0)
+        if wait:
+            logger.debug(f"{endpoint} 在限流器中等待 {wait * 1000:.0f}ms")
         if result.get("code") != 200:
-            raise Exception(f"API 调用失败，url: {url}, data: {data}, result: {result}")
+            raise ApiError(f"API 调用失败，url: {url}, data: {data}, result: {result}", result)
         return result
 
+    async def _async_call_api(self, url, data=None, headers=None, method="POST"):
+        """_call_api 的异步版本，阻塞请求放到线程池中执行"""
+        return await asyncio.to_thread(self._call_api, url, data, headers, method)
+
 
 class VehicleManager(JTGLManager):
     def list_vehicles(self) -> list[VehicleInfo]:
@@ -40,6 +129,13 @@ class VehicleManager(JTGLManager):
             VehicleInfo.from_api_response(vehicle) for vehicle in response.get("data")
         ]
 
+    async def async_list_vehicles(self) -> list[VehicleInfo]:
+        url = f"pro/vehicleController/getUserIdInfo"
+        response = await self._async_call_api(url, data={})
+        return [
+            VehicleInfo.from_api_response(vehicle) for vehicle in response.get("data")
+        ]
+
     def delete_vehicle(self, vId):
         url = f"pro/relationController/deleteRelation"
         response = self._call_api(url, data={"vId": vId})
@@ -57,36 +153,62 @@ class UserManager(JTGLManager):
         url = f"pro/applyRecordController/getJsrxx"
         response = self._call_api(url, data={})
         return UserInfo.from_api_response(response.get("data"))
+
+    async def async_get_user_info(self) -> UserInfo:
+        url = f"pro/applyRecordController/getJsrxx"
+        response = await self._async_call_api(url, data={})
+        return UserInfo.from_api_response(response.get("data"))
+
     def get_user_detail_info(self) -> UserDetailInfo:
+        """获取登录用户信息；token被拒绝时抛出 ApiError，网络错误和熔断等异常原样抛出，调用方据此区分"""
+        url = f"auth/userController/loginUser?state=101000004071"
         try:
-            url = f"auth/userController/loginUser?state=101000004071"
             headers = {"Source": SOURCE}
             response = self._call_api(
                 url,
                 data={"token": self.token, "state": "101000004071"},
                 headers=headers,
             )
-            if response.get("code") != 200:
-                raise Exception(f"登录失败，url: {url}, result: {response}")
             user_info = UserDetailInfo.from_api_response(response.get("data"))
-        except Exception as e:
-            logger.error(f"traceback.format_exc(): {traceback.format_exc()}")
-            raise Exception(f"登录失败，url: {url}, result: {e}")
+        except Exception:
+            logger.error(f"登录失败，url: {url}, traceback.format_exc(): {traceback.format_exc()}")
+            raise
         return user_info
 
 
 class ApplyRecordManager(JTGLManager):
-    def get_state_data(self) -> StateData:
-        """获取状态数据"""
+    def get_state_data(self, refresh: bool = False) -> StateData:
+        """获取状态数据，优先使用缓存，refresh为True时强制重新获取"""
+        cache = get_state_cache()
+        if not refresh:
+            state_data = cache.get(self.token)
+            if state_data is not None:
+                return state_data
         url = f"pro/applyRecordController/stateList"
         response = self._call_api(url, data={})
-        return StateData.from_api_response(response.get("data"))
+        state_data = StateData.from_api_response(response.get("data"))
+        cache.set(self.token, state_data)
+        return state_data
+
+    async def async_get_state_data(self, refresh: bool = False) -> StateData:
+        """异步获取状态数据，优先使用缓存，refresh为True时强制重新获取"""
+        cache = get_state_cache()
+        if not refresh:
+            state_data = cache.get(self.token)
+            if state_data is not None:
+                return state_data
+        url = f"pro/applyRecordController/stateList"
+        response = await self._async_call_api(url, data={})
+        state_data = StateData.from_api_response(response.get("data"))
+        cache.set(self.token, state_data)
+        return state_data
     
     def do_apply_record(self, apply_form: NewApplyForm | ApplyForm) -> dict:
         if isinstance(apply_form, NewApplyForm):
             return self.do_apply_record_v2(apply_form)
         else:
             return self.do_apply_record_v1(apply_form)
+
     def do_apply_record_v2(self, apply_form: NewApplyForm) -> dict:
         url = f"pro/applyRecordController/insertApplyRecord"
         response = self._call_api(url, data=apply_form.to_api_payload())
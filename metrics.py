@@ -0,0 +1,174 @@
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# 耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SPAN_METRIC = "cross_bj_span_duration_seconds"
+
+
+def percentile(values, pct):
+    """计算百分位数（最近秩法），values 为空时返回 0"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class Histogram:
+    """耗时直方图，另外保留最近的样本用于计算分位数"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, sample_size: int = 1000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.samples: deque[float] = deque(maxlen=sample_size)
+
+    def observe(self, value: float, error: bool = False):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+        if error:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        samples = list(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0,
+            "max": self.max,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+        }
+
+
+class MetricsRegistry:
+    """进程内的耗时统计，按 span 名称和标签分别聚合"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._series: dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, error: bool = False, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram(self.buckets)
+            histogram.observe(seconds, error)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """记录代码块的耗时，代码块抛出异常时计为一次错误"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error, **labels)
+
+    def to_json(self) -> list[dict]:
+        with self._lock:
+            series = [(name, dict(labels), histogram.summary()) for (name, labels), histogram in self._series.items()]
+        return [{"span": name, "labels": labels, **summary} for name, labels, summary in sorted(series, key=lambda item: item[0])]
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = [
+            f"# HELP {SPAN_METRIC} 各阶段耗时（秒）",
+            f"# TYPE {SPAN_METRIC} histogram",
+        ]
+        error_lines = [
+            "# HELP cross_bj_span_errors_total 各阶段出错次数",
+            "# TYPE cross_bj_span_errors_total counter",
+        ]
+        with self._lock:
+            items = sorted(self._series.items(), key=lambda item: item[0])
+            for (name, labels), histogram in items:
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in (("span", name), *labels))
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{SPAN_METRIC}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{SPAN_METRIC}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                lines.append(f"{SPAN_METRIC}_sum{{{label_text}}} {histogram.sum:.6f}")
+                lines.append(f"{SPAN_METRIC}_count{{{label_text}}} {histogram.count}")
+                error_lines.append(f"cross_bj_span_errors_total{{{label_text}}} {histogram.errors}")
+        return "\n".join(lines + error_lines) + "\n"
+
+    def write(self, directory: str) -> tuple[str, str]:
+        """将统计结果写入 metrics.prom 和 metrics.json，返回两个文件的路径"""
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, "metrics.prom")
+        json_path = os.path.join(directory, "metrics.json")
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=4)
+        return prom_path, json_path
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """获取全局耗时统计"""
+    return _registry
+
+
+def span(name: str, **labels):
+    """记录代码块耗时: with span("jtgl.call_api", endpoint=url): ..."""
+    return _registry.span(name, **labels)
+
+
+def timed(name: str):
+    """记录函数耗时的装饰器，支持普通函数和协程函数"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _registry.span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _registry.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,5 @@
 from tarfile import data_filter
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr, field_validator
 from typing import Optional
 from constant import LICENSE_PLATE_TYPE_MAP, VEHICLE_TYPE_MAP
 from datetime import datetime
@@ -407,32 +407,15 @@ class RecordInfo(BaseModel, AllowNoneConfig):
     hpzl: str = Field(default="", description="车牌类型")
     vid: str = Field(default="", description="车辆识别代号")
     
+    @field_validator("vid", mode="before")
+    @classmethod
+    def _to_str(cls, value) -> str:
+        return str(value)
+
     @classmethod
     def from_api_response(cls, data: dict) -> "RecordInfo":
-        """从API响应数据创建RecordInfo实例"""
-        return cls(
-            vId=data.get("vId", ""),
-            applyId=data.get("applyId", ""),
-            blzt=data.get("blzt", 0),
-            blztmc=data.get("blztmc", ""),
-            sxrqmc=data.get("sxrqmc", ""),
-            sxrzmc=data.get("sxrzmc"),
-            yxqs=data.get("yxqs", ""),
-            yxqz=data.get("yxqz"),
-            sxsyts=data.get("sxsyts"),
-            jjzzl=data.get("jjzzl", ""),
-            jjzzlmc=data.get("jjzzlmc", ""),
-            jjzh=data.get("jjzh"),
-            sqsj=data.get("sqsj", ""),
-            jsrxm=data.get("jsrxm", ""),
-            jszh=data.get("jszh", ""),
-            sfzmhm=data.get("sfzmhm"),
-            shsbyy=data.get("shsbyy"),
-            shsbyyms=data.get("shsbyyms"),
-            hphm=data.get("hphm", ""),
-            hpzl=data.get("hpzl", ""),
-            vid=str(data.get("vid", "")),
-        )
+        """从API响应数据创建RecordInfo实例（字段名与接口一致，直接整体校验）"""
+        return cls.model_validate(data)
     
     
     
@@ -512,40 +495,22 @@ class StateDataInfo(BaseModel, AllowNoneConfig):
     bzxx: list[RecordInfo] = Field(default=[], description="办证信息列表")
     ecbzxx: list[RecordInfo] = Field(default=[], description="二次办证信息列表")
     sfyecbzxx: bool = Field(default=False, description="是否有二次办证信息")
-    ecztbz: bool | None = Field(default=None, description="二次状态办证")
+    ecztbz: bool | None = Field(default=False, description="二次状态办证")
     
+    @field_validator("sycs", "syts", mode="before")
+    @classmethod
+    def _to_str(cls, value) -> str:
+        return str(value)
+
+    @field_validator("bzxx", "ecbzxx", mode="before")
+    @classmethod
+    def _none_to_list(cls, value) -> list:
+        return value or []
+
     @classmethod
     def from_api_response(cls, data: dict) -> "StateDataInfo":
-        """从API响应数据创建StateDataInfo实例"""
-        # 处理办证信息列表
-        bzxx_list = []
-        if data.get("bzxx"):
-            bzxx_list = [RecordInfo.from_api_response(record) for record in data["bzxx"]]
-        
-        # 处理二次办证信息列表
-        ecbzxx_list = []
-        if data.get("ecbzxx"):
-            ecbzxx_list = [RecordInfo.from_api_response(record) for record in data["ecbzxx"]]
-        
-        return cls(
-            vId=data.get("vId", ""),
-            hpzl=data.get("hpzl", ""),
-            hphm=data.get("hphm", ""),
-            ybcs=data.get("ybcs", 0),
-            bzts=data.get("bzts", 0),
-            kjts=data.get("kjts", 0),
-            sycs=str(data.get("sycs", "")),
-            syts=str(data.get("syts", "")),
-            ylzsfkb=data.get("ylzsfkb", False),
-            elzsfkb=data.get("elzsfkb", False),
-            bnbzyy=data.get("bnbzyy"),
-            qyzt=data.get("qyzt", 0),
-            cllx=data.get("cllx", ""),
-            bzxx=bzxx_list,
-            ecbzxx=ecbzxx_list,
-            sfyecbzxx=data.get("sfyecbzxx", False),
-            ecztbz=data.get("ecztbz", False),
-        )
+        """从API响应数据创建StateDataInfo实例，嵌套的办证信息一并校验"""
+        return cls.model_validate(data)
     
     def get_latest_record(self) -> RecordInfo | None:
         """获取最新的申请记录（优先二次办证信息）"""
@@ -579,23 +544,18 @@ class StateData(BaseModel, AllowNoneConfig):
     elzqyms: str = Field(default="", description="二类证说明")
     elzmc: str = Field(default="", description="二类证名称")
     bzclxx: list[StateDataInfo] = Field(default=[], description="办证车辆信息列表")
+    # 车辆ID -> 车辆信息的索引，首次按ID查找时构建
+    _vehicle_index: dict[str, StateDataInfo] | None = PrivateAttr(default=None)
     
+    @field_validator("bzclxx", mode="before")
+    @classmethod
+    def _none_to_list(cls, value) -> list:
+        return value or []
+
     @classmethod
     def from_api_response(cls, data: dict) -> "StateData":
-        """从API响应数据创建StateData实例"""
-        # 处理车辆信息列表
-        bzclxx_list = []
-        if data.get("bzclxx"):
-            bzclxx_list = [StateDataInfo.from_api_response(vehicle) for vehicle in data["bzclxx"]]
-        
-        return cls(
-            sfzmhm=data.get("sfzmhm", ""),
-            ylzqyms=data.get("ylzqyms", ""),
-            ylzmc=data.get("ylzmc", ""),
-            elzqyms=data.get("elzqyms", ""),
-            elzmc=data.get("elzmc", ""),
-            bzclxx=bzclxx_list,
-        )
+        """从API响应数据创建StateData实例，整个 stateList 响应只做一次校验"""
+        return cls.model_validate(data)
     
     def get_first_vehicle(self) -> StateDataInfo | None:
         """获取第一辆车的信息"""
@@ -603,22 +563,25 @@ class StateData(BaseModel, AllowNoneConfig):
     
     def get_vehicle_by_id(self, vId: str) -> StateDataInfo | None:
         """根据车辆ID获取车辆信息"""
-        for vehicle in self.bzclxx:
-            if vehicle.vId == vId:
-                return vehicle
-        return None
+        if self._vehicle_index is None:
+            self._vehicle_index = {vehicle.vId: vehicle for vehicle in self.bzclxx}
+        return self._vehicle_index.get(vId)
+
+    def _get_vehicle(self, vId: str | None) -> StateDataInfo | None:
+        """未指定车辆ID时返回第一辆车"""
+        return self.get_vehicle_by_id(vId) if vId else self.get_first_vehicle()
     
-    def get_latest_record(self) -> RecordInfo | None:
-        """获取最新的申请记录（从第一辆车）"""
-        first_vehicle = self.get_first_vehicle()
-        return first_vehicle.get_latest_record() if first_vehicle else None
+    def get_latest_record(self, vId: str | None = None) -> RecordInfo | None:
+        """获取指定车辆（默认第一辆车）最新的申请记录"""
+        vehicle = self._get_vehicle(vId)
+        return vehicle.get_latest_record() if vehicle else None
     
-    def can_apply(self) -> bool:
-        """检查是否可以申请进京证（第一辆车）"""
-        first_vehicle = self.get_first_vehicle()
-        return first_vehicle.can_apply() if first_vehicle else False
+    def can_apply(self, vId: str | None = None) -> bool:
+        """检查指定车辆（默认第一辆车）是否可以申请进京证"""
+        vehicle = self._get_vehicle(vId)
+        return vehicle.can_apply() if vehicle else False
     
-    def get_quota_info(self) -> dict:
-        """获取配额信息（第一辆车）"""
-        first_vehicle = self.get_first_vehicle()
-        return first_vehicle.get_remaining_quota() if first_vehicle else {}
+    def get_quota_info(self, vId: str | None = None) -> dict:
+        """获取指定车辆（默认第一辆车）的配额信息"""
+        vehicle = self._get_vehicle(vId)
+        return vehicle.get_remaining_quota() if vehicle else {}
@@ -0,0 +1,171 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+from metrics import span
+
+
+class NotifyQueue:
+    """后台推送队列：发送方只负责入队，推送由独立事件循环中的异步worker完成，不占用续签流程的时间"""
+
+    def __init__(self, maxsize: int = 1000, workers: int = 4, dedupe_window: float = 60):
+        """
+        Args:
+            maxsize: 最多排队的消息数，超出后丢弃新消息
+            workers: 并发推送的worker数量
+            dedupe_window: 相同渠道、相同标题和内容的消息在该时间（秒）内只推送一次
+        """
+        self.maxsize = maxsize
+        self.workers = workers
+        self.dedupe_window = dedupe_window
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        # 排队中的消息
+        self._pending: set[tuple] = set()
+        # 最近推送过的消息 -> 推送时间，容量与队列长度一致
+        self._recent: OrderedDict[tuple, float] = OrderedDict()
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "deduplicated": 0, "dropped": 0}
+
+    def start(self) -> "NotifyQueue":
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run_loop, name="notify-queue", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        for index in range(self.workers):
+            self._loop.create_task(self._worker(index))
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self._loop.close()
+
+    def _is_duplicate(self, key: tuple) -> bool:
+        if key in self._pending:
+            return True
+        sent_at = self._recent.get(key)
+        return sent_at is not None and time.monotonic() - sent_at < self.dedupe_window
+
+    def put(self, apobj, channel: tuple, title: str, body: str) -> bool:
+        """消息入队，返回是否入队成功（推送已关闭、重复或队列已满时返回False）"""
+        if not _enabled:
+            logger.debug(f"推送已关闭，忽略通知: {title}")
+            return False
+        key = (channel, title, body)
+        with self._lock:
+            if self._is_duplicate(key):
+                self.stats["deduplicated"] += 1
+                logger.debug(f"重复的推送通知已忽略: {title}")
+                return False
+            if len(self._pending) >= self.maxsize:
+                self.stats["dropped"] += 1
+                logger.warning(f"推送队列已满（{self.maxsize}），丢弃通知: {title}")
+                return False
+            self._pending.add(key)
+            self.stats["queued"] += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (key, apobj, title, body))
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            key, apobj, title, body = await self._queue.get()
+            try:
+                with span("apprise.notify"):
+                    result = await apobj.async_notify(body=body, title=title)
+                if result:
+                    logger.info(f"推送通知发送成功: {title}")
+                else:
+                    logger.warning(f"推送通知发送失败: {title}")
+                self._count("sent" if result else "failed")
+            except Exception as e:
+                logger.error(f"推送通知发送异常: {e}")
+                self._count("failed")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                    self._recent[key] = time.monotonic()
+                    self._recent.move_to_end(key)
+                    while len(self._recent) > self.maxsize:
+                        self._recent.popitem(last=False)
+                self._queue.task_done()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """等待队列中的消息全部推送完成，超时返回False"""
+        if self._loop is None or not self._thread.is_alive():
+            return True
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout)
+            return True
+        except concurrent.futures.TimeoutError:
+            # Python 3.11之前 concurrent.futures.TimeoutError 不是内置 TimeoutError 的子类
+            future.cancel()
+            return False
+
+    def stop(self, timeout: float | None = 30):
+        """在截止时间内尽量推送完剩余消息，然后停止事件循环"""
+        if self._thread is None:
+            return
+        if not self.flush(timeout):
+            with self._lock:
+                remaining = len(self._pending)
+            logger.warning(f"推送队列未能在 {timeout}s 内发送完毕，放弃 {remaining} 条通知")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
+        logger.debug(f"推送队列已停止: {self.stats}")
+
+
+_queue: NotifyQueue | None = None
+_queue_lock = threading.Lock()
+# 为False时忽略所有通知（状态导出等只读模式）
+_enabled = True
+
+
+def set_notifications_enabled(enabled: bool):
+    """打开或关闭推送，关闭后 NotifyQueue.put 直接丢弃消息"""
+    global _enabled
+    _enabled = enabled
+
+
+def get_notify_queue() -> NotifyQueue:
+    """获取全局推送队列，首次调用时启动"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                queue = NotifyQueue().start()
+                atexit.register(queue.stop)
+                _queue = queue
+    return _queue
+
+
+def shutdown_notify_queue(timeout: float | None = 30):
+    """推送完剩余消息（最多等待timeout秒）并停止全局推送队列（如果已启动）"""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.stop(timeout)
+            _queue = None
@@ -0,0 +1,213 @@
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from pydantic import BaseModel, Field
+
+from utils import logger
+
+# 默认的工作进程数：每个进程都加载一份完整的ddddocr模型，登录时验证码识别不是瓶颈，一两个进程足够
+DEFAULT_OCR_WORKERS = 2
+
+
+class OcrResult(BaseModel):
+    """验证码识别结果"""
+    text: str = Field(default="", description="识别出的验证码")
+    inference_ms: float = Field(default=0.0, description="模型推理耗时（毫秒）")
+    latency_ms: float = Field(default=0.0, description="从提交到返回的总耗时（毫秒）")
+    batch_size: int = Field(default=1, description="所在批次的图片数量")
+    worker_pid: int = Field(default=0, description="执行识别的进程ID")
+
+
+def create_ocr():
+    """创建只识别数字的验证码识别模型"""
+    import ddddocr
+
+    ocr = ddddocr.DdddOcr(show_ad=False)
+    ocr.set_ranges("0123456789")
+    return ocr
+
+
+def _worker_main(task_queue, result_queue, batch_size: int):
+    """工作进程：常驻一个已加载的模型，每次最多取走 batch_size 张排队的图片，识别完后一次性返回结果
+
+    ddddocr 每次只能识别一张图片，批量只减少队列的往返次数，模型推理仍是逐张进行的
+    """
+    ocr = create_ocr()
+    pid = os.getpid()
+    stopping = False
+    while not stopping:
+        item = task_queue.get()
+        if item is None:
+            break
+        batch = [item]
+        while len(batch) < batch_size:
+            try:
+                item = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        results = []
+        for job_id, image in batch:
+            start = time.perf_counter()
+            try:
+                text, error = ocr.classification(image), None
+            except Exception as e:
+                text, error = "", str(e)
+            results.append((job_id, text, (time.perf_counter() - start) * 1000, len(batch), pid, error))
+        result_queue.put(results)
+
+
+class OcrService:
+    """验证码识别服务：多进程常驻模型，通过队列提交图片，排队的图片按批取走（推理仍逐张进行）"""
+
+    def __init__(self, workers: int | None = None, batch_size: int = 8):
+        """
+        Args:
+            workers: 工作进程数，默认为 DEFAULT_OCR_WORKERS（不超过CPU核数）
+            batch_size: 每个工作进程一次最多从队列取走的图片数量
+        """
+        self.workers = workers or min(DEFAULT_OCR_WORKERS, os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self._ctx = mp.get_context("spawn")
+        self._task_queue = None
+        self._result_queue = None
+        self._processes: list = []
+        self._pending: dict[int, tuple[Future, float]] = {}
+        self._pending_lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._collector: threading.Thread | None = None
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._processes = [
+            self._ctx.Process(
+                target=_worker_main,
+                args=(self._task_queue, self._result_queue, self.batch_size),
+                name=f"ocr-worker-{i}",
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name="ocr-collector", daemon=True)
+        self._collector.start()
+        logger.info(f"验证码识别服务已启动，工作进程数: {self.workers}")
+
+    def _collect(self):
+        """接收工作进程返回的结果并完成对应的Future"""
+        while self._running or self._pending:
+            try:
+                results = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self._processes):
+                    self._fail_pending("验证码识别进程已退出")
+                    return
+                continue
+            now = time.perf_counter()
+            for job_id, text, inference_ms, batch_size, pid, error in results:
+                with self._pending_lock:
+                    future, submitted_at = self._pending.pop(job_id, (None, 0.0))
+                if future is None:
+                    continue
+                if error:
+                    future.set_exception(RuntimeError(f"验证码识别失败: {error}"))
+                else:
+                    future.set_result(OcrResult(
+                        text=text,
+                        inference_ms=inference_ms,
+                        latency_ms=(now - submitted_at) * 1000,
+                        batch_size=batch_size,
+                        worker_pid=pid,
+                    ))
+
+    def _fail_pending(self, message: str):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(message))
+
+    def submit(self, image: bytes) -> Future:
+        """提交一张验证码图片，返回结果为 OcrResult 的Future"""
+        if not self._running:
+            self.start()
+        job_id = next(self._job_ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[job_id] = (future, time.perf_counter())
+        self._task_queue.put((job_id, image))
+        return future
+
+    def classify(self, image: bytes, timeout: float = 60) -> OcrResult:
+        """识别一张验证码图片"""
+        return self.submit(image).result(timeout)
+
+    def classify_batch(self, images: list[bytes], timeout: float = 60) -> list[OcrResult]:
+        """批量识别验证码图片，结果顺序与输入一致"""
+        futures = [self.submit(image) for image in images]
+        return [future.result(timeout) for future in futures]
+
+    def stop(self, timeout: float = 5):
+        if not self._running:
+            return
+        self._running = False
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._fail_pending("验证码识别服务已停止")
+        if self._collector is not None:
+            self._collector.join(timeout)
+        self._processes = []
+
+
+_service: OcrService | None = None
+_service_options: dict = {}
+_service_lock = threading.Lock()
+
+
+def get_ocr_service() -> OcrService:
+    """获取全局验证码识别服务，首次调用时启动工作进程"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                service = OcrService(**_service_options)
+                service.start()
+                atexit.register(service.stop)
+                _service = service
+    return _service
+
+
+def configure_ocr_service(**kwargs):
+    """设置全局验证码识别服务的参数（如 workers），工作进程仍在首次识别时才启动；已启动的服务会先停止"""
+    global _service_options
+    shutdown_ocr_service()
+    with _service_lock:
+        _service_options = kwargs
+
+
+def shutdown_ocr_service():
+    """停止全局验证码识别服务（如果已启动）"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.stop()
+            _service = None
@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+from model import RecordInfo, StateData
+
+# 动作
+SKIP = "skip"
+APPLY_TODAY = "apply_today"
+APPLY_TOMORROW = "apply_tomorrow"
+REAPPLY = "reapply"
+
+ACTION_NAMES = {
+    SKIP: "无需续签",
+    APPLY_TODAY: "申请今天",
+    APPLY_TOMORROW: "申请明天",
+    REAPPLY: "重新申请",
+}
+
+ACTIVE_STATUS = "审核通过(生效中)"
+PENDING_STATUSES = frozenset(("审核中", "审核通过(待生效)"))
+# 生效中的进京证剩余天数降到该值时提前申请明天的
+RENEW_REMAINING_DAYS = 1
+
+
+@lru_cache(maxsize=4096)
+def parse_ordinal(value: str | None) -> int | None:
+    """将 YYYY-MM-DD 转为序数日，无法解析时返回None；车队中的有效期日期大量重复，结果缓存"""
+    if not value:
+        return None
+    try:
+        # 与 scheduler.next_check_time 等处一致使用 strptime，接受的日期格式相同
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except ValueError:
+        return None
+
+
+class PlanItem(NamedTuple):
+    """续签计划中的一行，对应一辆车"""
+    user: str
+    vId: str
+    hphm: str
+    status: str
+    remaining_days: int
+    action: str
+    apply_date: str | None
+
+
+class RenewalPlanner:
+    """批量续签决策：所有车辆使用同一个参考日期，一次遍历算出每辆车的动作"""
+
+    def __init__(self, today: date | None = None):
+        today = today or date.today()
+        self.today = today.toordinal()
+        self.today_str = today.isoformat()
+        self.tomorrow_str = (today + timedelta(days=1)).isoformat()
+
+    def remaining_days(self, record: RecordInfo) -> int:
+        """剩余天数（含当天），与 RecordInfo.calc_remaining_days 一致"""
+        end = parse_ordinal(record.yxqz)
+        return end - self.today + 1 if end is not None else 0
+
+    def decide(self, record: RecordInfo | None) -> tuple[str, str | None, int]:
+        """根据最新的申请记录返回 (动作, 申请日期, 剩余天数)"""
+        if record is None:
+            # 新车 没有任何申请记录 直接申请今天
+            return APPLY_TODAY, self.today_str, 0
+        remaining = self.remaining_days(record)
+        status = record.blztmc
+        if status == ACTIVE_STATUS:
+            if remaining <= RENEW_REMAINING_DAYS:
+                return APPLY_TOMORROW, self.tomorrow_str, remaining
+            return SKIP, None, remaining
+        if status in PENDING_STATUSES:
+            return SKIP, None, remaining
+        # 审核不通过、已失效等情况，重新申请今天
+        return REAPPLY, self.today_str, remaining
+
+    def plan_state(self, user: str, state_data: StateData) -> list[PlanItem]:
+        items = []
+        for vehicle in state_data.bzclxx:
+            record = vehicle.get_latest_record()
+            action, apply_date, remaining = self.decide(record)
+            items.append(
+                PlanItem(
+                    user,
+                    vehicle.vId,
+                    vehicle.hphm,
+                    record.blztmc if record is not None else "无申请记录",
+                    remaining,
+                    action,
+                    apply_date,
+                )
+            )
+        return items
+
+    def plan(self, states: dict[str, StateData]) -> list[PlanItem]:
+        """为所有用户的所有车辆生成续签计划，states 为 {用户名: 状态数据}"""
+        items = []
+        for user, state_data in states.items():
+            items.extend(self.plan_state(user, state_data))
+        return items
+
+
+def format_plan(items: list[PlanItem]) -> str:
+    """将续签计划格式化为文本表格"""
+    headers = ("用户", "车牌", "状态", "剩余天数", "动作", "申请日期")
+    rows = [
+        (item.user, item.hphm, item.status, str(item.remaining_days), ACTION_NAMES[item.action], item.apply_date or "-")
+        for item in items
+    ]
+    widths = [max(_display_width(row[i]) for row in [headers, *rows]) for i in range(len(headers))]
+
+    def format_row(row) -> str:
+        return "  ".join(cell + " " * (width - _display_width(cell)) for cell, width in zip(row, widths)).rstrip()
+
+    lines = [format_row(headers), "  ".join("-" * width for width in widths)]
+    lines.extend(format_row(row) for row in rows)
+    counts = {action: 0 for action in ACTION_NAMES}
+    for item in items:
+        counts[item.action] += 1
+    lines.append("")
+    lines.append("，".join(f"{ACTION_NAMES[action]} {count}" for action, count in counts.items()))
+    return "\n".join(lines)
+
+
+def _display_width(text: str) -> int:
+    """终端显示宽度，中文字符占两列"""
+    return sum(2 if ord(char) > 0x2E80 else 1 for char in text)
@@ -0,0 +1,206 @@
+"""续签运行的性能剖析：cProfile（pstats）、采样剖析（折叠栈，可直接用于火焰图工具）和重型依赖的导入耗时"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+from utils import logger
+
+# 需要单独统计导入耗时的重型依赖
+HEAVY_MODULES = ("ddddocr", "apprise", "pydantic")
+
+# Python 3.12起cProfile基于全局的sys.monitoring：同一时间只能启用一个，但会统计所有线程
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class _StatsSnapshot:
+    """pstats.Stats 只接受带 create_stats 的对象，用它包装已经采集好的数据，避免去停用其他线程上的剖析器"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class SamplingProfiler(threading.Thread):
+    """定时采集所有线程的调用栈，按阶段汇总为折叠栈"""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.interval = interval
+        self.label = ""
+        self.samples: Counter[tuple[str, str]] = Counter()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            label = self.label
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack.append(threads.get(thread_id, str(thread_id)))
+                self.samples[(label, ";".join(reversed(stack)))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self, label: str | None = None) -> str:
+        """折叠栈格式（每行: 栈帧;栈帧;... 次数），label 为 None 时包含所有阶段"""
+        merged: Counter[str] = Counter()
+        for (sample_label, stack), count in self.samples.items():
+            if label is None or sample_label == label:
+                merged[stack] += count
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+
+class RunProfiler:
+    """按阶段剖析一次运行：主线程每个阶段一个cProfile，阶段内新建的线程各自一个cProfile并归入该阶段
+
+    Python 3.12及以上只能同时启用一个cProfile，主线程的cProfile已经覆盖所有线程，不再为新线程单独创建
+
+    用法:
+        profiler = RunProfiler("profile")
+        profiler.start("startup")
+        ...
+        profiler.switch("user/张三")
+        ...
+        profiler.stop()
+        profiler.write()
+    """
+
+    def __init__(self, output_dir: str, sample_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.sampler = SamplingProfiler(sample_interval)
+        self.label = ""
+        self.labels: list[str] = []
+        self._profiles: dict[str, list[cProfile.Profile]] = {}
+        self._main_profile: cProfile.Profile | None = None
+        self._lock = threading.Lock()
+        self.durations: dict[str, float] = {}
+        self._started_at = 0.0
+
+    def _thread_hook(self, frame, event, arg):
+        """新线程的第一个事件：为该线程创建cProfile并替换掉本钩子"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他剖析工具在运行，该线程只由采样剖析覆盖，不能让异常中断线程
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._profiles.setdefault(self.label, []).append(profile)
+
+    def start(self, label: str):
+        self.sampler.start()
+        if PER_THREAD_PROFILES:
+            threading.setprofile(self._thread_hook)
+        self._begin(label)
+
+    def _begin(self, label: str):
+        self.label = label
+        self.sampler.label = label
+        self.labels.append(label)
+        self._started_at = time.perf_counter()
+        self._main_profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.setdefault(label, []).append(self._main_profile)
+        self._main_profile.enable()
+
+    def _end(self):
+        self._main_profile.disable()
+        self.durations[self.label] = time.perf_counter() - self._started_at
+
+    def switch(self, label: str):
+        """结束当前阶段并开始新的阶段"""
+        self._end()
+        self._begin(label)
+
+    def stop(self):
+        self._end()
+        if PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        self.sampler.stop()
+
+    def stats(self, label: str | None = None) -> pstats.Stats | None:
+        """合并指定阶段（None 表示全部阶段）所有线程的剖析数据"""
+        with self._lock:
+            profiles = [
+                profile
+                for profile_label, items in self._profiles.items()
+                if label is None or profile_label == label
+                for profile in items
+            ]
+        snapshots = []
+        for profile in profiles:
+            # 其他线程上的剖析器无法从这里停用，直接读取已采集的数据
+            profile.snapshot_stats()
+            if profile.stats:
+                snapshots.append(_StatsSnapshot(profile.stats))
+        if not snapshots:
+            return None
+        return pstats.Stats(*snapshots)
+
+    @staticmethod
+    def _file_name(label: str) -> str:
+        return re.sub(r"[^\w.-]+", "_", label).strip("_") or "unnamed"
+
+    def write(self, import_times: dict | None = None) -> str:
+        """写出整次运行和每个阶段的 pstats 与折叠栈文件，返回输出目录"""
+        phase_dir = os.path.join(self.output_dir, "phases")
+        os.makedirs(phase_dir, exist_ok=True)
+        run_stats = self.stats()
+        if run_stats is not None:
+            run_stats.dump_stats(os.path.join(self.output_dir, "run.pstats"))
+        with open(os.path.join(self.output_dir, "run.collapsed"), "w", encoding="utf-8") as f:
+            f.write(self.sampler.collapsed())
+        for label in self.labels:
+            name = self._file_name(label)
+            stats = self.stats(label)
+            if stats is not None:
+                stats.dump_stats(os.path.join(phase_dir, f"{name}.pstats"))
+            with open(os.path.join(phase_dir, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+                f.write(self.sampler.collapsed(label))
+        summary = {"durations": self.durations, "import_times": import_times or {}}
+        with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=4)
+        return self.output_dir
+
+
+def measure_import_times(modules=HEAVY_MODULES) -> dict[str, float]:
+    """在独立的子进程中用 -X importtime 测量每个模块的冷启动导入耗时（秒），不受当前进程已导入模块的影响"""
+    results = {}
+    for module in modules:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            logger.warning(f"无法导入 {module}，跳过导入耗时统计")
+            continue
+        # 格式: import time: self [us] | cumulative | imported package
+        for line in proc.stderr.splitlines():
+            parts = [part.strip() for part in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                results[module] = int(parts[1]) / 1e6
+    return results
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from utils import logger, percentile
+
+
+class ThrottledError(Exception):
+    """服务端返回限流（HTTP 429 或业务码 429）"""
+
+
+class TokenBucket:
+    """令牌桶，速率可以在运行中调整；令牌不足时预约后续令牌，按预约顺序等待"""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """取一个令牌，返回需要等待的时间（秒）"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = rate
+
+
+class AdaptiveBucket(TokenBucket):
+    """自适应令牌桶：被限流时速率减半，之后请求成功时按时间线性恢复到上限"""
+
+    # 同一批并发请求会同时被限流，这段时间（秒）内只下调一次
+    DECREASE_INTERVAL = 1.0
+    # 每秒恢复上限速率的比例，从减半恢复到上限约需10秒
+    RECOVER_RATIO = 0.05
+
+    def __init__(self, max_rate: float, min_rate: float):
+        super().__init__(max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.decreased_at = 0.0
+        self.increased_at = 0.0
+
+    def on_throttled(self) -> float:
+        now = time.monotonic()
+        if now - self.decreased_at >= self.DECREASE_INTERVAL:
+            self.decreased_at = now
+            self.increased_at = now
+            self.set_rate(max(self.min_rate, self.rate / 2))
+        return self.rate
+
+    def on_success(self):
+        if self.rate >= self.max_rate:
+            return
+        now = time.monotonic()
+        increase = self.max_rate * self.RECOVER_RATIO * (now - self.increased_at)
+        self.increased_at = now
+        self.set_rate(min(self.max_rate, self.rate + increase))
+
+
+class RateLimiter:
+    """所有用户共享的出站限流器，每个host和每个接口各有一个令牌桶"""
+
+    def __init__(self, host_rps: float = 20, endpoint_rps: float = 10, min_rps: float = 1):
+        """
+        Args:
+            host_rps: 每个host每秒最多请求数，0表示不限制
+            endpoint_rps: 每个接口（host+路径）每秒最多请求数，0表示不限制
+            min_rps: 被限流后速率下调的下限
+        """
+        self.host_rps = host_rps
+        self.endpoint_rps = endpoint_rps
+        self.min_rps = min_rps
+        self._buckets: dict[str, AdaptiveBucket] = {}
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=10000)
+        self.stats = {"requests": 0, "delayed": 0, "throttled": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def _bucket(self, key: str, rate: float) -> AdaptiveBucket | None:
+        if not rate:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(key, AdaptiveBucket(rate, self.min_rps))
+        return bucket
+
+    def _buckets_for(self, url: str) -> list[AdaptiveBucket]:
+        parsed = urlparse(url)
+        buckets = [
+            self._bucket(parsed.netloc, self.host_rps),
+            self._bucket(f"{parsed.netloc}{parsed.path}", self.endpoint_rps),
+        ]
+        return [bucket for bucket in buckets if bucket is not None]
+
+    def acquire(self, url: str) -> float:
+        """等待host和接口的令牌，返回在限流器中等待的时间（秒）"""
+        wait = max((bucket.reserve() for bucket in self._buckets_for(url)), default=0.0)
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["total_wait"] += wait
+            self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+            if wait > 0:
+                self.stats["delayed"] += 1
+            self._waits.append(wait)
+        return wait
+
+    def record_success(self, url: str):
+        for bucket in self._buckets_for(url):
+            bucket.on_success()
+
+    def record_throttled(self, url: str):
+        """服务端限流时下调该host和接口的速率"""
+        rates = [bucket.on_throttled() for bucket in self._buckets_for(url)]
+        with self._lock:
+            self.stats["throttled"] += 1
+        logger.warning(f"请求被限流，速率下调至 {min(rates, default=0):.1f} 次/秒: {urlparse(url).path}")
+
+    def wait_stats(self) -> dict:
+        """限流器等待时间统计"""
+        with self._lock:
+            waits = list(self._waits)
+            stats = dict(self.stats)
+        stats["p50_wait"] = percentile(waits, 50)
+        stats["p95_wait"] = percentile(waits, 95)
+        return stats
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取全局限流器"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    """按指定参数重建全局限流器，需在发出任何请求之前调用"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(**kwargs)
+    return _limiter
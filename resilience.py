@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from rate_limiter import ThrottledError
+from utils import logger
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class RetryPolicy:
+    """指数退避加随机抖动的重试策略"""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8):
+        """
+        Args:
+            max_retries: 最多重试次数（不含首次请求）
+            backoff_base: 第一次重试的退避上限（秒），之后每次翻倍
+            backoff_max: 单次退避的最长时间（秒）
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次重试（从0开始）前的等待时间，在退避上限内均匀随机，避免所有用户同时重试"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+def is_transient_error(error: Exception) -> bool:
+    """连接失败、超时和5xx响应视为暂时性错误，可以重试，也计入熔断"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+def is_connect_error(error: Exception) -> bool:
+    """建立连接阶段的失败，请求还没有发出，任何接口（包括提交申请）都可以安全重试"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def is_throttled_error(error: Exception) -> bool:
+    """服务端限流：HTTP 429 或业务码 429"""
+    if isinstance(error, ThrottledError):
+        return True
+    return (
+        isinstance(error, requests.HTTPError)
+        and error.response is not None
+        and error.response.status_code == 429
+    )
+
+
+class CircuitBreaker:
+    """所有用户共享的熔断器：连续失败达到阈值后打开，冷却期内直接拒绝请求，冷却结束后放行一个试探请求"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 10, reset_timeout: float = 60):
+        """
+        Args:
+            name: 熔断器名称，用于日志
+            failure_threshold: 连续失败多少次后打开熔断
+            reset_timeout: 熔断打开后多久放行试探请求（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {"trips": 0, "rejected": 0}
+
+    def before_call(self):
+        """请求前检查熔断状态，熔断打开时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.stats["rejected"] += 1
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"{self.name} 已熔断，{retry_after:.0f}s 后重试")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name} 恢复正常，熔断关闭")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self.stats["trips"] += 1
+                logger.warning(f"{self.name} 连续失败 {self.failures} 次，熔断 {self.reset_timeout:.0f}s")
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_retry_count = 0
+_retry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, failure_threshold: int = 10, reset_timeout: float = 60) -> CircuitBreaker:
+    """获取指定服务的全局熔断器，首次获取时按参数创建"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name, failure_threshold, reset_timeout))
+    return breaker
+
+
+def count_retry():
+    global _retry_count
+    with _retry_lock:
+        _retry_count += 1
+
+
+def get_resilience_stats() -> dict:
+    """重试次数、熔断次数和被熔断拒绝的请求数"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        "retries": _retry_count,
+        "breaker_trips": sum(breaker.stats["trips"] for breaker in breakers),
+        "breaker_rejected": sum(breaker.stats["rejected"] for breaker in breakers),
+    }
@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from config import UserConfig
+from model import RecordInfo, StateData
+from planner import RENEW_REMAINING_DAYS
+from utils import logger
+
+
+class RenewalScheduler:
+    """常驻调度器：根据每辆车的有效期计算下一次需要检查的时间，放入优先队列，只在有任务到期时唤醒"""
+
+    def __init__(
+        self,
+        user_configs: list[UserConfig],
+        run_fleet,
+        concurrency: int = 8,
+        timeout: float = 300,
+        check_hour: int = 8,
+        pending_recheck_hours: float = 2,
+        retry_minutes: float = 30,
+        max_sleep: float = 3600,
+    ):
+        """
+        Args:
+            user_configs: 需要调度的用户
+            run_fleet: 批量续签函数，签名与 cross_bj.run_fleet 一致
+            concurrency: 同时处理的用户数上限
+            timeout: 单个用户续签的超时时间（秒）
+            check_hour: 到期当天几点检查续签
+            pending_recheck_hours: 审核中的申请隔多久复查一次（小时）
+            retry_minutes: 处理失败或仍需续签时隔多久重试（分钟）
+            max_sleep: 单次最长休眠时间（秒），到时重新计算
+        """
+        self.users = {user.name: user for user in user_configs}
+        self.run_fleet = run_fleet
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.check_hour = check_hour
+        self.pending_recheck = timedelta(hours=pending_recheck_hours)
+        self.retry_interval = timedelta(minutes=retry_minutes)
+        self.max_sleep = max_sleep
+        # 队列元素: (检查时间, 序号, 用户名, 车辆ID, 版本号)
+        self._queue: list[tuple[datetime, int, str, str, int]] = []
+        self._versions: dict[str, int] = {}
+        self._seq = itertools.count()
+        self._stop_event = threading.Event()
+
+    def next_check_time(self, record: RecordInfo | None, now: datetime) -> datetime:
+        """根据一辆车最新的申请记录计算下一次需要检查的时间"""
+        if record is None:
+            # 新车，立即申请
+            return now
+        status = record.get_status_description()
+        if status in ("审核通过(生效中)", "审核通过(待生效)") and record.yxqz:
+            try:
+                expire_date = datetime.strptime(record.yxqz, "%Y-%m-%d")
+            except ValueError:
+                return now
+            # 剩余天数 = yxqz - 今天 + 1，降到 RENEW_REMAINING_DAYS 的那天需要申请
+            due_date = expire_date - timedelta(days=RENEW_REMAINING_DAYS - 1)
+            return max(now, due_date.replace(hour=self.check_hour))
+        if status == "审核中":
+            return now + self.pending_recheck
+        # 审核不通过、已失效等情况，立即重新申请
+        return now
+
+    def schedule_user(self, name: str, state_data: StateData | None, now: datetime, just_processed: bool):
+        """根据状态数据为用户的每辆车安排下一次检查，旧的排期自动作废"""
+        version = self._versions.get(name, 0) + 1
+        self._versions[name] = version
+        vehicles = state_data.bzclxx if state_data is not None else []
+        if not vehicles:
+            when = now + self.retry_interval if just_processed else now
+            heapq.heappush(self._queue, (when, next(self._seq), name, "", version))
+            return
+        for vehicle in vehicles:
+            when = self.next_check_time(vehicle.get_latest_record(), now)
+            # 刚处理过仍然到期，说明续签失败或暂时无法续签，稍后重试
+            if just_processed and when <= now:
+                when = now + self.retry_interval
+            heapq.heappush(self._queue, (when, next(self._seq), name, vehicle.vId, version))
+
+    def _pop_due(self, now: datetime) -> list[UserConfig]:
+        """取出所有已到期的用户（同一用户只取一次）"""
+        due = {}
+        while self._queue and self._queue[0][0] <= now:
+            _, _, name, _, version = heapq.heappop(self._queue)
+            if self._versions.get(name) != version or name not in self.users:
+                continue
+            due[name] = self.users[name]
+        return list(due.values())
+
+    def run_once(self, now: datetime | None = None) -> int:
+        """处理所有到期用户并重新排期，返回处理的用户数"""
+        now = now or datetime.now()
+        due_users = self._pop_due(now)
+        if not due_users:
+            return 0
+        logger.info(f"调度器唤醒，{len(due_users)} 个用户到期")
+        report = asyncio.run(self.run_fleet(due_users, self.concurrency, self.timeout))
+        logger.info(f"本轮续签完成: {report.summary()}")
+        finished = datetime.now()
+        for user in due_users:
+            self.schedule_user(user.name, report.states.get(user.name), finished, just_processed=True)
+        return len(due_users)
+
+    def next_wakeup(self) -> datetime | None:
+        """下一次需要唤醒的时间"""
+        while self._queue:
+            _, _, name, _, version = self._queue[0]
+            if self._versions.get(name) == version:
+                return self._queue[0][0]
+            heapq.heappop(self._queue)
+        return None
+
+    def run_forever(self):
+        """首次启动时检查所有用户，之后休眠到最早的到期时间"""
+        now = datetime.now()
+        for name in self.users:
+            self.schedule_user(name, None, now, just_processed=False)
+        while not self._stop_event.is_set():
+            self.run_once()
+            wakeup = self.next_wakeup()
+            if wakeup is None:
+                logger.info("没有需要调度的用户，调度器退出")
+                return
+            sleep_seconds = min(self.max_sleep, max(0.0, (wakeup - datetime.now()).total_seconds()))
+            logger.info(f"下一次检查时间: {wakeup:%Y-%m-%d %H:%M:%S}，休眠 {sleep_seconds:.0f}s")
+            self._stop_event.wait(sleep_seconds)
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,119 @@
+import base64
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from cryptography.fernet import Fernet, InvalidToken
+from loguru import logger
+
+# 环境变量：直接提供密钥内容，或指定密钥文件路径
+KEY_ENV = "CROSS_BJ_URL_KEY"
+KEY_FILE_ENV = "CROSS_BJ_KEY_FILE"
+DEFAULT_KEY_FILE = "url_key.key"
+
+
+class SecretKeyMissingError(Exception):
+    """找不到加密密钥"""
+
+
+class SecretProvider(ABC):
+    """密钥提供者：密钥只加载一次，解密结果在进程内缓存"""
+
+    def __init__(self):
+        self._fernet: Fernet | None = None
+        self._decrypted: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def load_key(self) -> bytes:
+        """读取密钥，找不到时抛出 SecretKeyMissingError"""
+
+    @property
+    def fernet(self) -> Fernet:
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    self._fernet = Fernet(self.load_key())
+        return self._fernet
+
+    def encrypt(self, value: str) -> str:
+        """加密并编码为可以写入配置文件的字符串"""
+        if not value:
+            return ""
+        return base64.b64encode(self.fernet.encrypt(value.encode())).decode()
+
+    def decrypt(self, encrypted: str) -> str:
+        """解密配置文件中的加密字符串，相同的密文只解密一次"""
+        if not encrypted:
+            return ""
+        value = self._decrypted.get(encrypted)
+        if value is None:
+            try:
+                value = self.fernet.decrypt(base64.b64decode(encrypted.encode())).decode()
+            except (InvalidToken, ValueError) as e:
+                raise ValueError(f"解密失败，请确认密钥与配置文件匹配: {e!r}") from e
+            with self._lock:
+                self._decrypted[encrypted] = value
+        return value
+
+
+class FileSecretProvider(SecretProvider):
+    """从密钥文件读取密钥"""
+
+    def __init__(self, path: str = DEFAULT_KEY_FILE):
+        super().__init__()
+        self.path = path
+
+    def load_key(self) -> bytes:
+        if not os.path.exists(self.path):
+            raise SecretKeyMissingError(
+                f"密钥文件不存在: {os.path.abspath(self.path)}，请按README下载 url_key.key，"
+                f"或通过环境变量 {KEY_ENV} 提供密钥"
+            )
+        with open(self.path, "rb") as f:
+            key = f.read().strip()
+        logger.debug(f"已从 {self.path} 加载密钥")
+        return key
+
+
+class EnvSecretProvider(SecretProvider):
+    """从环境变量读取密钥"""
+
+    def __init__(self, name: str = KEY_ENV):
+        super().__init__()
+        self.name = name
+
+    def load_key(self) -> bytes:
+        key = os.environ.get(self.name, "").strip()
+        if not key:
+            raise SecretKeyMissingError(f"环境变量 {self.name} 未设置")
+        return key.encode()
+
+
+def create_secret_provider() -> SecretProvider:
+    """设置了 CROSS_BJ_URL_KEY 时从环境变量读取密钥，否则读取 CROSS_BJ_KEY_FILE 指定的文件（默认 url_key.key）"""
+    if os.environ.get(KEY_ENV):
+        return EnvSecretProvider(KEY_ENV)
+    return FileSecretProvider(os.environ.get(KEY_FILE_ENV, DEFAULT_KEY_FILE))
+
+
+_provider: SecretProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_secret_provider() -> SecretProvider:
+    """获取全局密钥提供者"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_secret_provider()
+    return _provider
+
+
+def configure_secret_provider(provider: SecretProvider | None = None) -> SecretProvider:
+    """替换全局密钥提供者，不指定时按环境变量重新创建"""
+    global _provider
+    with _provider_lock:
+        _provider = provider or create_secret_provider()
+    return _provider
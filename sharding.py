@@ -0,0 +1,225 @@
+"""多节点分片：按一致性哈希把用户分配给各节点，用SQLite租约保证每个周期每个用户只处理一次
+
+租约数据库是单机的替代实现：SQLite的WAL模式依赖同一台机器上的共享内存索引，
+放在NFS/SMB等网络文件系统上时加锁不可靠。多个节点必须运行在同一台机器上
+（多个进程或挂载同一个本地目录的容器）；分布在多台机器上时只使用 --shard 静态分片。
+
+用法:
+    # 同一台机器上的三个进程（或容器）
+    python cross_bj.py --shard 0/3 --lease-db /var/lib/cross_bj/leases.db
+    python cross_bj.py --shard 1/3 --lease-db /var/lib/cross_bj/leases.db
+    python cross_bj.py --shard 2/3 --lease-db /var/lib/cross_bj/leases.db
+
+    # 三台机器分别执行，不使用租约
+    python cross_bj.py --shard 0/3
+"""
+import argparse
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from config import UserConfig
+
+# 每个分片在哈希环上的虚拟节点数，越多分布越均匀
+VIRTUAL_NODES = 64
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """解析 --shard 参数（i/n，i从0开始）"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 i/n，例如 0/3: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"分片序号应在 0 到 {count - 1} 之间: {value}")
+    return index, count
+
+
+def shard_key(user: UserConfig) -> str:
+    """用户的分片键：优先使用北京通手机号，同一账号的登录状态（cookie）始终留在同一个节点上"""
+    return user.bjt_phone or user.name
+
+
+class HashRing:
+    """一致性哈希环，分片数变化时只有少部分用户会换节点"""
+
+    def __init__(self, count: int, virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f"shard-{shard}#{replica}"), shard)
+            for shard in range(count)
+            for replica in range(virtual_nodes)
+        )
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._shards[i]
+
+
+class ShardFilter:
+    """判断用户是否属于本节点的分片，可直接作为 ConfigManager.user_filter 使用"""
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+        self.ring = HashRing(count)
+
+    def __call__(self, user: UserConfig) -> bool:
+        return self.ring.shard_for(shard_key(user)) == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+class LeaseStore:
+    """用户租约（SQLite，WAL模式，只能由同一台机器上的进程共用，不能放在网络文件系统上），同一周期内：
+    - 同一时间只有一个节点持有某个用户的租约，持有者崩溃后租约到期即可被其他节点接管
+    - 用户处理成功后标记完成，本周期内不再被任何节点处理
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leases (
+            user TEXT NOT NULL,
+            cycle TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            completed_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (user, cycle)
+        );
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        """
+        Args:
+            path: 数据库文件路径，同一台机器上的多个节点共用同一个本地文件
+            timeout: 等待其他节点释放写锁的最长时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个线程一个连接，事务手动控制"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, user: str, cycle: str, owner: str, ttl: float) -> bool:
+        """尝试获取租约：没有租约、租约已过期或本来就由自己持有时成功；本周期已完成时失败"""
+        conn = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE 立即获取写锁，读取和更新之间不会被其他节点插入
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT owner, expires_at, completed_at FROM leases WHERE user = ? AND cycle = ?",
+                (user, cycle),
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO leases (user, cycle, owner, expires_at) VALUES (?, ?, ?, ?)",
+                    (user, cycle, owner, now + ttl),
+                )
+                acquired = True
+            else:
+                holder, expires_at, completed_at = row
+                acquired = completed_at is None and (holder == owner or expires_at <= now)
+                if acquired:
+                    # 持有者续期不算新的尝试
+                    renewed = holder == owner and expires_at > now
+                    conn.execute(
+                        "UPDATE leases SET owner = ?, expires_at = ?, attempts = attempts + ? "
+                        "WHERE user = ? AND cycle = ?",
+                        (owner, now + ttl, 0 if renewed else 1, user, cycle),
+                    )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def complete(self, user: str, cycle: str, owner: str) -> bool:
+        """标记本周期已处理完成，租约已被其他节点接管时返回False"""
+        cursor = self._connection().execute(
+            "UPDATE leases SET completed_at = ? WHERE user = ? AND cycle = ? AND owner = ?",
+            (time.time(), user, cycle, owner),
+        )
+        return cursor.rowcount > 0
+
+    def release(self, user: str, cycle: str, owner: str):
+        """处理失败时立即释放租约，其他节点可以马上接管重试"""
+        self._connection().execute(
+            "UPDATE leases SET expires_at = 0 WHERE user = ? AND cycle = ? AND owner = ? AND completed_at IS NULL",
+            (user, cycle, owner),
+        )
+
+    def pending(self, users: list[str], cycle: str) -> list[str]:
+        """本周期既没有完成、也没有有效租约的用户，按传入顺序返回"""
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT user, expires_at, completed_at FROM leases WHERE cycle = ?", (cycle,)
+        ).fetchall()
+        busy = {user for user, expires_at, completed_at in rows if completed_at is not None or expires_at > now}
+        return [user for user in users if user not in busy]
+
+    def unfinished(self, users: list[str], cycle: str) -> list[str]:
+        """本周期尚未完成的用户（包括租约仍被其他节点持有的），按传入顺序返回"""
+        rows = self._connection().execute(
+            "SELECT user FROM leases WHERE cycle = ? AND completed_at IS NOT NULL", (cycle,)
+        ).fetchall()
+        completed = {user for user, in rows}
+        return [user for user in users if user not in completed]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class UserLease:
+    """绑定了节点、周期和租约时长的租约操作，供 run_fleet 在处理每个用户前后调用"""
+
+    def __init__(self, store: LeaseStore, ttl: float, owner: str | None = None, cycle: str | None = None):
+        """
+        Args:
+            store: 租约存储
+            ttl: 租约时长（秒），应大于单个用户的处理超时
+            owner: 节点标识，默认为 主机名:进程号
+            cycle: 周期标识，默认为当天日期，即每个用户每天处理一次
+        """
+        self.store = store
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.cycle = cycle or date.today().isoformat()
+
+    def acquire(self, user: str) -> bool:
+        return self.store.acquire(user, self.cycle, self.owner, self.ttl)
+
+    def complete(self, user: str) -> bool:
+        return self.store.complete(user, self.cycle, self.owner)
+
+    def release(self, user: str):
+        self.store.release(user, self.cycle, self.owner)
+
+    def pending(self, users: list[str]) -> list[str]:
+        return self.store.pending(users, self.cycle)
+
+    def unfinished(self, users: list[str]) -> list[str]:
+        return self.store.unfinished(users, self.cycle)
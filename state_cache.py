@@ -0,0 +1,51 @@
+import threading
+import time
+
+from model import StateData
+
+
+class StateCache:
+    """stateList 状态快照缓存，按token区分，超过有效期或发生写操作后失效"""
+
+    def __init__(self, ttl: float = 300):
+        """
+        Args:
+            ttl: 缓存有效期（秒）
+        """
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, StateData]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> StateData | None:
+        """获取未过期的状态快照，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key: str, state_data: StateData):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), state_data)
+
+    def invalidate(self, key: str):
+        """使指定token的状态快照失效，下次读取时重新获取"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_state_cache = StateCache()
+
+
+def get_state_cache() -> StateCache:
+    """获取全局状态缓存"""
+    return _state_cache
@@ -0,0 +1,111 @@
+"""车队状态导出：每辆车一行，边获取边写入 JSON Lines 或 CSV，不会提交任何申请"""
+import csv
+import json
+import sys
+
+from model import StateData, StateDataInfo
+from utils import get_future_date
+
+# CSV 的列，JSON Lines 的每行也使用相同的字段
+STATUS_FIELDS = (
+    "user",
+    "vId",
+    "hphm",
+    "status",
+    "apply_type",
+    "start_date",
+    "end_date",
+    "apply_date",
+    "remaining_days",
+    "can_apply",
+    "remaining_times",
+    "quota_remaining_days",
+    "used_times",
+    "total_days",
+    "available_days",
+    "error",
+)
+
+
+def vehicle_status_row(user: str, vehicle: StateDataInfo) -> dict:
+    """单辆车的状态行，字段与 CrossBJ.get_current_status 一致，配额信息展开为单独的列"""
+    record = vehicle.get_latest_record()
+    quota = vehicle.get_remaining_quota()
+    row = {
+        "user": user,
+        "vId": vehicle.vId,
+        "hphm": vehicle.hphm,
+        "status": "无申请记录",
+        "apply_type": "",
+        "start_date": "",
+        "end_date": "",
+        "apply_date": "",
+        "remaining_days": 0,
+        "can_apply": vehicle.can_apply(),
+        "remaining_times": quota["remaining_times"],
+        "quota_remaining_days": quota["remaining_days"],
+        "used_times": quota["used_times"],
+        "total_days": quota["total_days"],
+        "available_days": quota["available_days"],
+        "error": "",
+    }
+    if record is not None:
+        row.update(
+            status=record.blztmc,
+            apply_type=record.jjzzlmc,
+            start_date=record.yxqs,
+            end_date=record.yxqz if record.yxqz else get_future_date(record.yxqs, 6),
+            apply_date=record.sqsj,
+            remaining_days=record.calc_remaining_days(),
+        )
+    return row
+
+
+def status_rows(user: str, state_data: StateData | None, error: str = "") -> list[dict]:
+    """用户所有车辆的状态行；获取状态失败时返回一行只带用户名和错误信息的记录"""
+    if state_data is None:
+        return [{**dict.fromkeys(STATUS_FIELDS, ""), "user": user, "error": error or "获取状态失败"}]
+    return [vehicle_status_row(user, vehicle) for vehicle in state_data.bzclxx]
+
+
+class StatusWriter:
+    """按行写出状态，每写完一个用户刷新一次，输出文件中始终是已获取到的完整结果
+
+    path 为 "-" 时写到标准输出；格式由扩展名决定：.csv 为CSV，其余为 JSON Lines
+    """
+
+    def __init__(self, path: str, fmt: str | None = None):
+        self.path = path
+        self.format = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        self.rows = 0
+        if path == "-":
+            self._file = sys.stdout
+            self._owns_file = False
+        else:
+            # utf-8-sig 便于Excel直接打开中文CSV
+            encoding = "utf-8-sig" if self.format == "csv" else "utf-8"
+            self._file = open(path, "w", encoding=encoding, newline="")
+            self._owns_file = True
+        self._csv = None
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=STATUS_FIELDS)
+            self._csv.writeheader()
+
+    def write_rows(self, rows: list[dict]):
+        for row in rows:
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.rows += len(rows)
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from config import UserConfig
+from jtgl_manager import ApiError, UserManager
+from utils import logger
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+class TokenStore:
+    """token元数据管理：记录获取时间和最近校验时间，判断是否需要校验或提前刷新"""
+
+    def __init__(self, ttl_hours: int = 168, refresh_hours: int = 24, probe_minutes: int = 60):
+        """
+        Args:
+            ttl_hours: token的有效时长（小时）
+            refresh_hours: 距离过期不足该时长时提前刷新（小时）
+            probe_minutes: 距离上次校验超过该时长时重新校验（分钟）
+        """
+        self.ttl = timedelta(hours=ttl_hours)
+        self.refresh_window = timedelta(hours=refresh_hours)
+        self.probe_interval = timedelta(minutes=probe_minutes)
+
+    def expires_at(self, user: UserConfig) -> Optional[datetime]:
+        """根据获取时间推算的过期时间，获取时间未知时返回None"""
+        obtained_at = _parse_time(user.auth_obtained_at)
+        return obtained_at + self.ttl if obtained_at else None
+
+    def needs_refresh(self, user: UserConfig, now: Optional[datetime] = None) -> bool:
+        """token即将过期，需要提前重新登录"""
+        expires_at = self.expires_at(user)
+        if expires_at is None:
+            return False
+        return expires_at - (now or datetime.now()) <= self.refresh_window
+
+    def needs_probe(self, user: UserConfig, now: Optional[datetime] = None) -> bool:
+        """距离上次校验已超过校验间隔"""
+        validated_at = _parse_time(user.auth_validated_at)
+        if validated_at is None:
+            return True
+        return (now or datetime.now()) - validated_at >= self.probe_interval
+
+    def probe(self, user: UserConfig) -> bool:
+        """调用 loginUser 接口校验token，成功时更新校验时间，返回token是否有效
+
+        只有服务端明确拒绝token（非200业务码）时才返回False；网络错误、超时、5xx和熔断
+        说明接口暂时不可用，无法判断token是否有效，保留token且不更新校验时间，下次再校验
+        """
+        try:
+            detail = UserManager(user.auth).get_user_detail_info()
+        except ApiError as e:
+            logger.warning(f"用户 {user.name} token校验失败: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"用户 {user.name} token暂时无法校验，保留当前token: {e!r}")
+            return True
+        user.auth_validated_at = datetime.now().strftime(TIME_FORMAT)
+        # 旧配置没有记录获取时间，用接口返回的登录时间补齐
+        if not user.auth_obtained_at and _parse_time(detail.dlsj):
+            user.auth_obtained_at = detail.dlsj
+        return True
+
+    def record_login(self, user: UserConfig, token: str):
+        """记录新获取的token"""
+        now = datetime.now().strftime(TIME_FORMAT)
+        user.auth = token
+        user.auth_obtained_at = now
+        user.auth_validated_at = now
+
+
+class TokenRefresher(threading.Thread):
+    """后台线程，定期检查并提前刷新即将过期的token"""
+
+    def __init__(self, refresh: Callable[[], None], interval: float = 3600):
+        """
+        Args:
+            refresh: 执行一次检查和刷新的函数
+            interval: 检查间隔（秒）
+        """
+        super().__init__(name="token-refresher", daemon=True)
+        self.refresh = refresh
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"后台刷新token失败: {e}")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,126 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limiter import get_rate_limiter
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """发送前经过全局限流器，响应上记录在限流器中的等待时间（rate_limit_wait），遇到HTTP 429时下调速率"""
+
+    def send(self, request, **kwargs):
+        limiter = get_rate_limiter()
+        wait = limiter.acquire(request.url)
+        response = super().send(request, **kwargs)
+        response.rate_limit_wait = wait
+        if response.status_code == 429:
+            limiter.record_throttled(request.url)
+        else:
+            limiter.record_success(request.url)
+        return response
+
+
+def create_session(pool_maxsize: int = 4) -> requests.Session:
+    """创建经过全局限流器的独立会话（保留cookie），用于北京通登录等需要会话状态的场景"""
+    session = requests.Session()
+    adapter = RateLimitedAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HttpTransport:
+    """共享的HTTP传输层，所有JTGLManager复用同一个连接池，认证头按请求传入"""
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        max_retries: int = 0,
+        backoff_factor: float = 0.3,
+        timeout: float = 30,
+    ):
+        """
+        Args:
+            pool_connections: 缓存的连接池数量（按host区分）
+            pool_maxsize: 每个host保持的最大keep-alive连接数
+            max_retries: 连接失败时在连接池内的重试次数，默认不重试，由 JTGLManager 统一重试（每次尝试都经过熔断器）
+            backoff_factor: 重试间隔的退避系数
+            timeout: 单个请求的默认超时时间（秒）
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"Content-Type": "application/json", "Connection": "keep-alive"}
+        )
+        # 共享会话不保存cookie，避免不同用户之间串用
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        # 只重试建立连接阶段的错误，请求一旦发出就不再重放，避免重复提交申请；
+        # 默认 max_retries=0，不与 JTGLManager 的重试叠加
+        # 不按状态码重试：urllib3默认的allowed_methods不含POST，而这里的接口都是POST，5xx由 JTGLManager 处理
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff_factor,
+        )
+        self.adapter = RateLimitedAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def request(self, method, url, headers=None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def connection_stats(self) -> dict:
+        """统计请求数、新建连接数和复用连接数"""
+        new_connections = 0
+        total_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            total_requests += pool.num_requests
+        return {
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused_connections": total_requests - new_connections,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_transport: HttpTransport | None = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """获取全局共享的传输层实例"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
+
+def configure_transport(**kwargs) -> HttpTransport:
+    """按指定参数重建全局传输层，需在创建任何JTGLManager之前调用"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = HttpTransport(**kwargs)
+    return _transport
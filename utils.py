@@ -1,14 +1,43 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
-import base64
-import os
-from cryptography.fernet import Fernet
+import threading
 
 
 import apprise
 from loguru import logger
 
+from metrics import percentile, span
+from notify_queue import get_notify_queue
+from secret_provider import get_secret_provider
+
+
+_apprise_cache: dict[tuple, apprise.Apprise] = {}
+_apprise_lock = threading.Lock()
+
+
+def normalize_urls(urls) -> tuple:
+    """将推送URL配置整理为去空白、去重、排序后的元组，作为推送渠道的标识"""
+    if not urls:
+        return ()
+    if isinstance(urls, str):
+        urls = [urls]
+    return tuple(sorted({url.strip() for url in urls if url.strip()}))
+
+
+def get_apprise(channel: tuple) -> apprise.Apprise:
+    """获取推送渠道对应的Apprise对象，每组URL只创建一次"""
+    apobj = _apprise_cache.get(channel)
+    if apobj is None:
+        with _apprise_lock:
+            apobj = _apprise_cache.get(channel)
+            if apobj is None:
+                apobj = apprise.Apprise()
+                for url in channel:
+                    apobj.add(url)
+                _apprise_cache[channel] = apobj
+    return apobj
+
 
 class SendMessage(ABC):
     @abstractmethod
@@ -33,34 +62,78 @@ class AppriseNotifier(SendMessage):
                     "webhook://your_webhook_url"
                 ]
         """
-        self.apobj = apprise.Apprise()
-        if urls:
-            if isinstance(urls, str):
-                urls = [urls]
-            for url in urls:
-                if url.strip():
-                    self.apobj.add(url.strip())
+        # 推送渠道标识，用于推送队列去重；相同渠道共用一个Apprise对象
+        self.channel = normalize_urls(urls)
+        self.apobj = get_apprise(self.channel)
 
     def send(self, title, msg):
-        """发送通知"""
+        """发送通知：消息交给后台推送队列，不等待推送完成"""
         if not self.apobj:
             print("未配置推送服务，不发送推送")
             return
-        
-        try:
-            # 发送通知，支持多种推送方式
-            result = self.apobj.notify(
-                body=msg,
-                title=title
-            )
-            if result:
-                logger.info(f"推送通知发送成功: {title}")
-            else:
-                logger.warning("推送通知发送失败")
-        except Exception as e:
-            logger.error(f"推送通知发送异常: {e}")
-            import traceback
-            logger.error(f"详细错误信息: {traceback.format_exc()}")
+
+        with span("apprise.send"):
+            get_notify_queue().put(self.apobj, self.channel, title, msg)
+
+
+class FleetDigest:
+    """汇总模式：收集一次运行中所有用户的推送消息，按推送URL合并，每个URL只推送一条
+
+    用户配置了多个URL时，消息分别计入每个URL；多个用户共用的URL只会收到一条合并后的消息
+    """
+
+    def __init__(self):
+        self._messages: dict[tuple, list[tuple[str, str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def notifier(self, name: str, urls) -> "DigestNotifier":
+        """为用户创建只记录消息、不立即推送的通知器"""
+        return DigestNotifier(self, name, urls)
+
+    def add(self, channel: tuple, name: str, title: str, msg: str):
+        """记录一条消息，channel 为用户的全部推送URL，按单个URL分别汇总"""
+        with self._lock:
+            for url in channel:
+                self._messages.setdefault((url,), []).append((name, title, msg))
+
+    @staticmethod
+    def build_message(messages: list[tuple[str, str, str]]) -> tuple[str, str]:
+        """合并同一URL的消息，只有一条时保持原样"""
+        if len(messages) == 1:
+            _, title, msg = messages[0]
+            return title, msg
+        failures = sum(1 for _, title, _ in messages if "失败" in title)
+        title = f"进京证续签汇总: {len(messages)}条消息"
+        if failures:
+            title += f"，{failures}条失败"
+        body = "\n".join(f"[{name}] {title}\n{msg}" for name, title, msg in messages)
+        return title, body
+
+    def flush(self) -> int:
+        """将汇总消息交给推送队列，每个URL一条，返回推送的URL数"""
+        with self._lock:
+            messages, self._messages = self._messages, {}
+        for channel, items in messages.items():
+            title, body = self.build_message(items)
+            get_notify_queue().put(get_apprise(channel), channel, title, body)
+        if messages:
+            logger.info(f"汇总推送: {len(messages)}个推送URL各推送一条汇总消息")
+        return len(messages)
+
+
+class DigestNotifier(SendMessage):
+    """汇总模式下的用户通知器，消息在运行结束时由 FleetDigest 统一推送"""
+
+    def __init__(self, digest: FleetDigest, name: str, urls=None):
+        self.digest = digest
+        self.name = name
+        self.channel = normalize_urls(urls)
+
+    def send(self, title, msg):
+        if not self.channel:
+            print("未配置推送服务，不发送推送")
+            return
+        self.digest.add(self.channel, self.name, title, msg)
 
 
 
@@ -104,43 +177,11 @@ def get_future_date(date_str, days):
     return future_date.strftime("%Y-%m-%d")
 
 
-def _get_or_create_key():
-    """获取或创建加密密钥"""
-    key_file = "url_key.key"
-    if os.path.exists(key_file):
-        with open(key_file, "rb") as f:
-            return f.read()
-    else:
-        key = Fernet.generate_key()
-        with open(key_file, "wb") as f:
-            f.write(key)
-        return key
-
-
 def encrypt_url(url: str) -> str:
     """加密URL"""
-    if not url:
-        return ""
-    try:
-        key = _get_or_create_key()
-        fernet = Fernet(key)
-        encrypted_url = fernet.encrypt(url.encode())
-        return base64.b64encode(encrypted_url).decode()
-    except Exception as e:
-        logger.error(f"URL加密失败: {e}")
-        return ""
+    return get_secret_provider().encrypt(url)
 
 
 def decrypt_url(encrypted_url: str) -> str:
-    """解密URL"""
-    if not encrypted_url:
-        return ""
-    try:
-        key = _get_or_create_key()
-        fernet = Fernet(key)
-        encrypted_data = base64.b64decode(encrypted_url.encode())
-        decrypted_url = fernet.decrypt(encrypted_data)
-        return decrypted_url.decode()
-    except Exception as e:
-        logger.error(f"URL解密失败: {e}")
-        return ""
+    """解密URL，结果在进程内缓存；密钥缺失或不匹配时抛出异常"""
+    return get_secret_provider().decrypt(encrypted_url)